@@ -3,10 +3,10 @@
 Digital Signage Web Dashboard
 """
 
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory, g, has_request_context
 from werkzeug.utils import secure_filename
 from werkzeug.security import check_password_hash, generate_password_hash
-from functools import wraps
+from functools import wraps, lru_cache
 import os
 from pathlib import Path
 import logging
@@ -14,22 +14,70 @@ import time
 import shutil  # NEW: For cache deletion
 import subprocess
 import signal
+import select
+import io
+import fcntl
 import sys
 import json
+import secrets
+import tempfile
+import hashlib
 from pathlib import PurePath
+from collections import namedtuple
+from typing import List, Union
 import platform
 import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from presentation_converter import PresentationConverter
+from presentation_converter import PresentationConverter, parse_display_size
 
 # Optional: psutil for system stats (graceful degradation if not installed)
 try:
     import psutil
     HAS_PSUTIL = True
+    # Seed the CPU counters so api_system_stats can use the non-blocking interval=None form
+    psutil.cpu_percent(interval=None)
 except ImportError:
     HAS_PSUTIL = False
     psutil = None
 
+# Optional: orjson for faster playlist/config (de)serialization (falls back to stdlib json)
+try:
+    import orjson
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    def json_dumps(obj):
+        return json.dumps(obj).encode()
+    json_loads = json.loads
+
+# Optional: msgspec decodes and validates playlist JSON in C in a single pass
+try:
+    import msgspec
+
+    class PlaylistEntry(msgspec.Struct):
+        name: str
+        repeats: int = 1
+
+    _playlist_decoder = msgspec.json.Decoder(List[Union[str, PlaylistEntry]])
+    HAS_MSGSPEC = True
+except ImportError:
+    HAS_MSGSPEC = False
+    msgspec = None
+    _playlist_decoder = None
+
+# Optional: inotify_simple lets a watcher thread flag content changes (Linux only);
+# without it the caches fall back to comparing mtimes on every request
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    HAS_INOTIFY = True
+except (ImportError, OSError):
+    HAS_INOTIFY = False
+    INotify = None
+    inotify_flags = None
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -48,6 +96,9 @@ CACHE_DIR = Path.home() / 'signage' / 'cache' / 'slides'  # NEW: Cache directory
 CONFIG_FILE = Path.home() / 'signage' / 'config.json'
 PLAYLIST_FILE = Path.home() / 'signage' / 'playlist.json'
 WEB_PLAYER_PID = Path.home() / 'signage' / 'web_player.pid'
+# `python web_player.py` execs into gunicorn (cmdline `... web_player:app`) in the same
+# pid, so match a substring common to both forms
+WEB_PLAYER_CMD_MATCH = 'web_player'
 COMMANDS_DIR = Path.home() / 'signage' / 'commands'
 COMMANDS_DIR.mkdir(parents=True, exist_ok=True)
 WEB_COMMAND_FILE = COMMANDS_DIR / 'web.json'
@@ -55,11 +106,70 @@ LOGS_DIR = Path.home() / 'signage' / 'logs'
 LOGS_DIR.mkdir(parents=True, exist_ok=True)
 UPLOAD_TMP_DIR = Path.home() / 'signage' / 'uploads_tmp'
 UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
-ALLOWED_VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
-ALLOWED_PPT_EXTENSIONS = {'.pptx', '.ppt', '.pdf'}
+# RAM-backed dir for small, frequently rewritten state such as the chunk-upload sidecars,
+# so they don't cost SD-card writes (gunicorn already uses /dev/shm as its worker tmp dir)
+RUNTIME_DIR = Path('/dev/shm') / f"signage-{os.getuid()}" if Path('/dev/shm').is_dir() else UPLOAD_TMP_DIR
+UPLOAD_SPOOL_THRESHOLD = 500 * 1024  # same cut-off Werkzeug uses before spooling to disk
+
+
+class UploadRequest(Request):
+    """Spool large multipart uploads into UPLOAD_TMP_DIR instead of the system temp dir.
+    That keeps 2GB uploads out of a tmpfs /tmp and puts the spool file on the same
+    filesystem as the content dirs, so upload_file can hard-link it into place.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if self.path.startswith('/upload_chunk/') and total_content_length is not None \
+                and total_content_length <= 2 * UPLOAD_CHUNK_SIZE:
+            # A chunk is copied into assembled.bin right away; keep it in RAM, not on the SD card
+            return io.BytesIO()
+        if total_content_length is None or total_content_length > UPLOAD_SPOOL_THRESHOLD:
+            return tempfile.NamedTemporaryFile('wb+', dir=UPLOAD_TMP_DIR, prefix='spool-')
+        return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+
+
+app.request_class = UploadRequest
+
+ALLOWED_VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.webm'})
+ALLOWED_PPT_EXTENSIONS = frozenset({'.pptx', '.ppt', '.pdf'})
+# Lowercase extension -> format label shown in the dashboard
+FILE_FORMATS = {'.pdf': 'PDF', '.pptx': 'PPTX', '.ppt': 'PPTX', **dict.fromkeys(ALLOWED_VIDEO_EXTENSIONS, 'VIDEO')}
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # must match CHUNK_SIZE in dashboard.html
+UPLOAD_SESSION_TTL = 3600  # seconds of inactivity before a chunked upload session is forgotten
+UPLOAD_COPY_BLOCK = 1024 * 1024  # read size when a chunk has to be copied through userspace
+# Zero-copy file concatenation is only reliable for file->file on Linux
+USE_SENDFILE = hasattr(os, 'sendfile') and sys.platform.startswith('linux')
 
 USERS = {'admin': generate_password_hash('signage')}
 
+# Recently verified logins, keyed by (stored hash, keyed BLAKE2b of the attempt) so the
+# plaintext is never kept; lets repeat logins skip the full PBKDF2 check. Values are the
+# time.monotonic() of the verification; entries older than VERIFIED_LOGIN_TTL are misses.
+_VERIFIED_LOGINS = {}
+_VERIFIED_LOGINS_MAX = 64
+VERIFIED_LOGIN_TTL = 300  # seconds
+_verified_logins_lock = threading.Lock()
+
+# One dashboard file listing row; a namedtuple so Jinja reads fields as plain attributes
+FileRow = namedtuple('FileRow', 'name size type format in_playlist')
+
+# Dashboard file listings. 'video' / 'presentation' hold (dir change token, rows) with
+# in_playlist unset; 'entry' holds (key, videos, presentations) for the last render,
+# where key is the change_token() of the videos dir, presentations dir and playlist.
+_DIR_CACHE = {}
+
+# Chunked upload sessions: session_id -> {'safe_name', 'tmp_dir', 'state_dir', 'content_type', 'last_seen'}.
+# This is a per-process shortcut; the temp dir is derived from the session id, so a
+# chunk that lands on another gunicorn worker can rebuild the entry from the form.
+UPLOAD_SESSIONS = {}
+_upload_sessions_lock = threading.Lock()
+
+# Parsed playlist.json, reused until the file's (st_mtime_ns, st_size), or its inotify
+# generation while the watcher runs, changes.
+# 'normalized' and 'names' are derived once per change; treat all values as read-only.
+_PLAYLIST_CACHE = {'key': None, 'raw': [], 'normalized': [], 'names': frozenset()}
+_playlist_cache_lock = threading.Lock()
+
 def is_ffmpeg_available():
     try:
         subprocess.run(["ffmpeg", "-version"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
@@ -67,27 +177,157 @@ def is_ffmpeg_available():
     except Exception:
         return False
 
-def transcode_video(input_path: Path, output_path: Path) -> bool:
+# H.264 encoders in order of preference; hardware encoders first, libx264 as the fallback.
+# v4l2m2m (Raspberry Pi) and videotoolbox have no CRF mode, so they use a fixed bitrate.
+H264_ENCODERS = {
+    'h264_v4l2m2m': ["-c:v", "h264_v4l2m2m", "-b:v", "4M"],
+    'h264_nvenc': ["-c:v", "h264_nvenc", "-preset", "p4", "-rc", "vbr", "-cq", "23"],
+    'h264_qsv': ["-c:v", "h264_qsv", "-global_quality", "23"],
+    'h264_videotoolbox': ["-c:v", "h264_videotoolbox", "-b:v", "4M"],
+    'libx264': ["-c:v", "libx264", "-preset", "veryfast", "-crf", "23"],
+}
+
+# Fragmented MP4 is streamable as written, unlike +faststart which rewrites the whole
+# file after encoding to move the moov atom. Set "mp4_faststart": true in config.json
+# for players that need a classic MP4.
+MP4_MOVFLAGS_FRAGMENTED = "+frag_keyframe+empty_moov+default_base_moof"
+MP4_MOVFLAGS_FASTSTART = "+faststart"
+
+@lru_cache(maxsize=1)
+def get_h264_encoder():
+    """Return the preferred H.264 encoder this ffmpeg build offers (probed once)."""
+    try:
+        res = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"], capture_output=True, text=True, check=False)
+        available = {line.split()[1] for line in res.stdout.splitlines() if len(line.split()) > 1}
+    except Exception:
+        return 'libx264'
+    for name in H264_ENCODERS:
+        if name in available:
+            return name
+    return 'libx264'
+
+def transcode_video(input_path: Path, output_path: Path, threads: int = None, encoder: str = None) -> bool:
     """Transcode a video to H.264/AAC MP4 optimized for web playback.
+    Uses a hardware H.264 encoder when ffmpeg has one (see get_h264_encoder()) and
+    retries with libx264 if it fails, e.g. when the device node is missing.
+    threads caps ffmpeg's thread count (used when several transcodes run at once).
     Returns True on success.
     """
-    cmd = [
-        "ffmpeg", "-y", "-i", str(input_path),
-        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23",
-        "-pix_fmt", "yuv420p", "-movflags", "+faststart",
+    encoder = encoder or get_h264_encoder()
+    movflags = MP4_MOVFLAGS_FASTSTART if read_config().get('mp4_faststart') else MP4_MOVFLAGS_FRAGMENTED
+    cmd = ["ffmpeg", "-y", "-i", str(input_path)] + H264_ENCODERS[encoder] + [
+        "-pix_fmt", "yuv420p", "-movflags", movflags,
         "-c:a", "aac", "-b:a", "128k",
-        str(output_path)
     ]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd.append(str(output_path))
     try:
         subprocess.run(cmd, check=True)
         return True
     except subprocess.CalledProcessError as e:
-        logger.error("ffmpeg failed: %s", e)
+        logger.error("ffmpeg failed (%s): %s", encoder, e)
+        if encoder != 'libx264':
+            return transcode_video(input_path, output_path, threads, 'libx264')
         return False
 
+def append_file(fin, fout):
+    """Append the remainder of file object fin to fout.
+    Uses os.sendfile() on Linux when fin is backed by a real file so bytes never
+    pass through userspace; in-memory streams fall back to shutil.copyfileobj.
+    """
+    if USE_SENDFILE:
+        try:
+            in_fd = fin.fileno()
+        except (AttributeError, OSError, ValueError):
+            in_fd = None
+        if in_fd is not None:
+            offset = fin.tell()
+            size = os.fstat(in_fd).st_size
+            fout.flush()
+            while offset < size:
+                sent = os.sendfile(fout.fileno(), in_fd, offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            fin.seek(offset)
+            return
+    shutil.copyfileobj(fin, fout)
+
+def write_file_at(fin, fd, offset):
+    """Write the remainder of file object fin into descriptor fd starting at offset.
+    fd must be private to the caller (its file position is moved); data is sent with
+    os.sendfile() when fin is backed by a real file, otherwise with os.pwrite()
+    (straight from the buffer for the in-memory chunk streams UploadRequest hands out).
+    """
+    if isinstance(fin, io.BytesIO):
+        start = fin.tell()
+        with fin.getbuffer() as buf:
+            view = buf[start:]
+            while view:
+                written = os.pwrite(fd, view, offset)
+                view = view[written:]
+                offset += written
+            end = len(buf)
+        fin.seek(end)
+        return
+    if USE_SENDFILE:
+        try:
+            in_fd = fin.fileno()
+        except (AttributeError, OSError, ValueError):
+            in_fd = None
+        if in_fd is not None:
+            in_offset = fin.tell()
+            size = os.fstat(in_fd).st_size
+            os.lseek(fd, offset, os.SEEK_SET)
+            while in_offset < size:
+                sent = os.sendfile(fd, in_fd, in_offset, size - in_offset)
+                if sent == 0:
+                    break
+                in_offset += sent
+            fin.seek(in_offset)
+            return
+    while True:
+        block = fin.read(UPLOAD_COPY_BLOCK)
+        if not block:
+            return
+        view = memoryview(block)
+        while view:
+            written = os.pwrite(fd, view, offset)
+            view = view[written:]
+            offset += written
+
 def allowed_file(filename, allowed_extensions):
     return Path(filename).suffix.lower() in allowed_extensions
 
+def _password_digest(password: str) -> bytes:
+    return hashlib.blake2b(password.encode(), digest_size=16, key=app.secret_key.encode()[:64]).digest()
+
+def verify_password(username, password):
+    """Check a login attempt, reusing a successful PBKDF2 verification from the last
+    VERIFIED_LOGIN_TTL seconds if any."""
+    stored = USERS.get(username)
+    if stored is None or not password:
+        return False
+    key = (stored, _password_digest(password))
+    verified_at = _VERIFIED_LOGINS.get(key)
+    if verified_at is not None and time.monotonic() - verified_at < VERIFIED_LOGIN_TTL:
+        return True
+    if not check_password_hash(stored, password):
+        return False
+    with _verified_logins_lock:
+        _VERIFIED_LOGINS.pop(key, None)  # re-insert at the end so FIFO eviction stays oldest-first
+        if len(_VERIFIED_LOGINS) >= _VERIFIED_LOGINS_MAX:
+            _VERIFIED_LOGINS.pop(next(iter(_VERIFIED_LOGINS)))
+        _VERIFIED_LOGINS[key] = time.monotonic()
+    return True
+
+def forget_verified_logins(username):
+    stored = USERS.get(username)
+    with _verified_logins_lock:
+        for key in [k for k in _VERIFIED_LOGINS if k[0] == stored]:
+            del _VERIFIED_LOGINS[key]
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -96,65 +336,177 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def get_file_size(filepath):
-    size = filepath.stat().st_size
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} TB"
-
-def get_file_format(filepath):
-    ext = filepath.suffix.lower()
-    if ext == '.pdf':
-        return 'PDF'
-    elif ext in ['.pptx', '.ppt']:
-        return 'PPTX'
-    elif ext in ['.mp4', '.avi', '.mov', '.mkv', '.webm']:
-        return 'VIDEO'
-    return 'UNKNOWN'
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+def fmt_bytes(n):
+    """Convert bytes to human readable size.
+    The unit index comes straight from n.bit_length() instead of a divide loop.
+    """
+    if n < 1024:
+        return f"{n} B"
+    u = min((n.bit_length() - 1) // 10, 4)
+    return f"{n / (1 << (u * 10)):.1f} {_SIZE_UNITS[u]}"
+
+def _walk_file_sizes(path):
+    """Yield sizes of all regular files below path using os.scandir (no symlink following)."""
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_file_sizes(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                yield entry.stat(follow_symlinks=False).st_size
 
 # NEW: Helper function to get cache size
 def get_cache_size(presentation_name):
     """Get size of cached slides for a presentation"""
     cache_path = CACHE_DIR / Path(presentation_name).stem
-    if cache_path.exists() and cache_path.is_dir():
-        total_size = sum(f.stat().st_size for f in cache_path.rglob('*') if f.is_file())
-        return get_file_size_from_bytes(total_size)
-    return "0 B"
+    try:
+        return fmt_bytes(sum(_walk_file_sizes(cache_path)))
+    except (FileNotFoundError, NotADirectoryError):
+        return "0 B"
+
 
-def get_file_size_from_bytes(size):
-    """Convert bytes to human readable size"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size < 1024.0:
-            return f"{size:.1f} {unit}"
-        size /= 1024.0
-    return f"{size:.1f} TB"
+def list_content_files(directory: Path, allowed_extensions, content_type):
+    """Return a sorted tuple of FileRow for the dashboard from a single os.scandir() pass.
+    DirEntry carries the file type from readdir, so only one stat() per file is needed.
+    in_playlist is left False; see get_listing().
+    """
+    rows = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            ext = os.path.splitext(entry.name)[1].lower()
+            if ext not in allowed_extensions:
+                continue
+            rows.append(FileRow(
+                entry.name,
+                fmt_bytes(entry.stat().st_size),
+                content_type,
+                FILE_FORMATS.get(ext, 'UNKNOWN'),
+                False
+            ))
+    rows.sort()
+    return tuple(rows)
+
+
+def get_listing(directory: Path, allowed_extensions, content_type, token, playlist_set):
+    """Return the rows for one content dir, rescanning only when its change token changed.
+    A playlist-only change just recomputes the in_playlist column.
+    """
+    cached = _DIR_CACHE.get(content_type)
+    if cached and cached[0] == token:
+        rows = cached[1]
+    else:
+        rows = list_content_files(directory, allowed_extensions, content_type)
+        _DIR_CACHE[content_type] = (token, rows)
+    return tuple(row._replace(in_playlist=row.name in playlist_set) for row in rows)
 
 
 def read_config():
     try:
         if CONFIG_FILE.exists():
-            return json.loads(CONFIG_FILE.read_text())
+            return json_loads(CONFIG_FILE.read_bytes())
     except Exception:
         logger.exception('Failed to read config')
     # default
     return {'mode': 'both'}
 
 
-def read_playlist():
+def _playlist_file_key():
+    if not _watcher_state['started']:
+        start_content_watcher()
+    if _watcher_state['active']:
+        return change_token('playlist', PLAYLIST_FILE)
     try:
-        if PLAYLIST_FILE.exists():
-            return json.loads(PLAYLIST_FILE.read_text())
-    except Exception:
-        logger.exception('Failed to read playlist')
-    return []
+        st = PLAYLIST_FILE.stat()
+        return (st.st_mtime_ns, st.st_size)
+    except FileNotFoundError:
+        return (0, 0)
+
+
+def _store_playlist_state(key, raw, normalized=False):
+    items = raw if normalized else normalize_playlist_to_objects(raw)
+    state = {
+        'key': key,
+        'raw': raw,
+        'normalized': items,
+        'names': frozenset(item['name'] for item in items),
+    }
+    _PLAYLIST_CACHE.update(state)
+    if has_request_context():
+        g.playlist_state = state
+    return state
+
+
+def decode_playlist_entries(data: bytes):
+    """Decode playlist JSON bytes straight into normalized {'name', 'repeats'} objects.
+    Uses the compiled msgspec schema; returns None when msgspec is missing or the data
+    doesn't fit the strict schema (e.g. legacy 'filename' keys or string repeats), so
+    the caller can fall back to json_loads() + normalize_playlist_to_objects().
+    """
+    if _playlist_decoder is None:
+        return None
+    try:
+        entries = _playlist_decoder.decode(data)
+    except (msgspec.ValidationError, msgspec.DecodeError):
+        return None
+    return [
+        {'name': e, 'repeats': 1} if isinstance(e, str) else {'name': e.name, 'repeats': max(1, e.repeats)}
+        for e in entries
+        if (e if isinstance(e, str) else e.name)
+    ]
+
+
+def load_playlist():
+    """Return the parsed playlist state: {'key', 'raw', 'normalized', 'names'}.
+    playlist.json is only re-read when its mtime/size changes, and the result is
+    memoized on flask.g for the rest of the request. Callers must not mutate it.
+    """
+    if has_request_context() and 'playlist_state' in g:
+        return g.playlist_state
+    key = _playlist_file_key()
+    with _playlist_cache_lock:
+        if _PLAYLIST_CACHE['key'] == key:
+            state = dict(_PLAYLIST_CACHE)
+            if has_request_context():
+                g.playlist_state = state
+            return state
+        raw = []
+        try:
+            if PLAYLIST_FILE.exists():
+                data = PLAYLIST_FILE.read_bytes()
+                items = decode_playlist_entries(data)
+                if items is not None:
+                    return _store_playlist_state(key, items, normalized=True)
+                raw = json_loads(data)
+        except Exception:
+            logger.exception('Failed to read playlist')
+        return _store_playlist_state(key, raw)
 
 
-def write_playlist(lst):
+def atomic_write_bytes(path: Path, data: bytes):
+    """Write data with a single write() into a unique sibling temp file, then
+    os.replace() it over path so readers never see a truncated or half-written file.
+    """
+    tmp = path.with_name(f"{path.name}.{secrets.token_hex(4)}.tmp")
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+def write_playlist(lst, normalized=False):
+    """Save the playlist. Pass normalized=True when lst is already a list of
+    {'name', 'repeats'} objects so the cache refresh can skip normalization.
+    """
     try:
         PLAYLIST_FILE.parent.mkdir(parents=True, exist_ok=True)
-        PLAYLIST_FILE.write_text(json.dumps(lst))
+        atomic_write_bytes(PLAYLIST_FILE, json_dumps(lst))
+        with _playlist_cache_lock:
+            _store_playlist_state(_playlist_file_key(), lst, normalized)
         return True
     except Exception:
         logger.exception('Failed to write playlist')
@@ -183,50 +535,148 @@ def normalize_playlist_to_objects(raw):
     return out
 
 
-def playlist_names_set(raw):
-    """Return a set of playlist filenames regardless of format."""
-    s = set()
-    if not raw:
-        return s
-    if isinstance(raw, list):
-        for item in raw:
-            if isinstance(item, str):
-                s.add(item)
-            elif isinstance(item, dict):
-                n = item.get('name') or item.get('filename')
-                if n:
-                    s.add(n)
-    return s
+def normalize_playlist_order(data):
+    """Normalize a playlist_order POST body (list of names or {name, repeats} objects)."""
+    normalized = []
+    for entry in data:
+        if isinstance(entry, str):
+            normalized.append({'name': entry, 'repeats': 1})
+        elif isinstance(entry, dict):
+            name = entry.get('name')
+            if not name:
+                continue
+            try:
+                repeats = int(entry.get('repeats', 1))
+            except Exception:
+                repeats = 1
+            normalized.append({'name': name, 'repeats': max(1, repeats)})
+    return normalized
 
 
-def item_exists(name):
+def item_exists(name, known=None):
     """Check if a playlist item (video or presentation) exists on disk.
     Returns True if the file exists in videos or presentations directory.
     """
     if not name:
         return False
-    # Check videos
-    video_path = VIDEOS_DIR / name
-    if video_path.exists():
-        return True
-    # Check presentations
-    pres_path = PRESENTATIONS_DIR / name
-    if pres_path.exists():
-        return True
-    return False
+    if known is None:
+        known = content_names()
+    return name in known
 
 
-def filter_valid_playlist(playlist):
+def _mtime_ns(path: Path):
+    try:
+        return path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+
+# Change counters bumped by the inotify watcher thread. While the watcher is active
+# they replace the per-request mtime checks, so validating the caches costs no syscalls.
+_WATCH_GENERATIONS = {}
+_watcher_state = {'started': False, 'active': False}
+_watcher_lock = threading.Lock()
+
+
+def _content_watch_loop(notifier, watches):
+    lost = inotify_flags.IGNORED | inotify_flags.DELETE_SELF | inotify_flags.MOVE_SELF
+    try:
+        while True:
+            for event in notifier.read():
+                if event.mask & inotify_flags.Q_OVERFLOW:
+                    # Events were dropped (wd is -1, so no name); invalidate every cache
+                    logger.warning('inotify queue overflowed, invalidating all content caches')
+                    for key in _WATCH_GENERATIONS:
+                        _WATCH_GENERATIONS[key] += 1
+                    continue
+                name = watches.get(event.wd)
+                if event.mask & lost:
+                    # A watched dir went away; the generations can no longer be trusted
+                    logger.warning('inotify watch lost, falling back to mtime polling')
+                    _watcher_state['active'] = False
+                    return
+                if name == 'playlist' and event.name != PLAYLIST_FILE.name:
+                    continue
+                if name:
+                    _WATCH_GENERATIONS[name] += 1
+    except Exception:
+        logger.exception('inotify watcher failed, falling back to mtime polling')
+        _watcher_state['active'] = False
+
+
+def start_content_watcher():
+    """Start the inotify watcher thread once per process (no-op without inotify_simple)."""
+    with _watcher_lock:
+        if _watcher_state['started']:
+            return
+        _watcher_state['started'] = True
+    if not HAS_INOTIFY:
+        return
+    try:
+        notifier = INotify()
+        mask = (inotify_flags.CREATE | inotify_flags.DELETE | inotify_flags.MOVED_TO |
+                inotify_flags.MOVED_FROM | inotify_flags.CLOSE_WRITE |
+                inotify_flags.DELETE_SELF | inotify_flags.MOVE_SELF)
+        watches = {}
+        for name, directory in (('videos', VIDEOS_DIR), ('presentations', PRESENTATIONS_DIR), ('playlist', PLAYLIST_FILE.parent)):
+            directory.mkdir(parents=True, exist_ok=True)
+            _WATCH_GENERATIONS[name] = 0
+            watches[notifier.add_watch(str(directory), mask)] = name
+        threading.Thread(target=_content_watch_loop, args=(notifier, watches), name='content-watcher', daemon=True).start()
+        _watcher_state['active'] = True
+        logger.info('inotify content watcher started')
+    except Exception:
+        logger.exception('Could not start inotify watcher, using mtime polling')
+
+
+def change_token(name, path: Path):
+    """Return a value that changes whenever path (a watched dir or playlist.json) changes:
+    the watcher's generation counter when inotify is active, otherwise the mtime.
+    """
+    if not _watcher_state['started']:
+        start_content_watcher()
+    if _watcher_state['active']:
+        return ('inotify', _WATCH_GENERATIONS[name])
+    return _mtime_ns(path)
+
+
+def _scan_names(directory: Path):
+    try:
+        with os.scandir(directory) as it:
+            return frozenset(entry.name for entry in it)
+    except FileNotFoundError:
+        return frozenset()
+
+
+def content_names():
+    """Return a frozenset of every filename in the videos and presentations dirs.
+    The snapshot is taken with one scandir per directory and reused until either
+    directory changes (see change_token()).
+    """
+    key = (change_token('videos', VIDEOS_DIR), change_token('presentations', PRESENTATIONS_DIR))
+    cached = _DIR_CACHE.get('names')
+    if cached and cached[0] == key:
+        return cached[1]
+    names = _scan_names(VIDEOS_DIR) | _scan_names(PRESENTATIONS_DIR)
+    _DIR_CACHE['names'] = (key, names)
+    return names
+
+
+def filter_valid_playlist(playlist, known=None):
     """Remove orphaned items from playlist that no longer exist on disk.
+    Items are checked against a single directory snapshot (see content_names())
+    rather than stat'ing each one; pass known to reuse an existing snapshot.
     Returns cleaned playlist and list of removed items.
     """
+    if known is None:
+        known = content_names()
     normalized = normalize_playlist_to_objects(playlist)
     valid_items = []
     removed_items = []
     
     for item in normalized:
         name = item.get('name')
-        if name and item_exists(name):
+        if name and name in known:
             valid_items.append(item)
         elif name:
             removed_items.append(name)
@@ -238,7 +688,7 @@ def filter_valid_playlist(playlist):
 def write_config(cfg: dict):
     try:
         CONFIG_FILE.parent.mkdir(parents=True, exist_ok=True)
-        CONFIG_FILE.write_text(json.dumps(cfg))
+        atomic_write_bytes(CONFIG_FILE, json_dumps(cfg))
         return True
     except Exception:
         logger.exception('Failed to write config')
@@ -255,9 +705,30 @@ def get_pid_from_pidfile(pidfile: Path):
         return None
 
 
+# (pidfile, expected_cmd_substr) -> (pid, starttime) of the last process verified by is_process_running()
+_verified_procs = {}
+
+
+def get_proc_state(pid: int):
+    """Return (state, starttime) from /proc/<pid>/stat, or None if it can't be read.
+    state is field 3 (e.g. b'R', b'S', b'Z'); starttime is field 22, which identifies
+    a process incarnation.
+    """
+    try:
+        with open(f"/proc/{pid}/stat", 'rb') as f:
+            raw = f.read()
+        # comm (field 2) may contain spaces, so split after its closing paren; field 3 is index 0
+        fields = raw.rpartition(b')')[2].split()
+        return fields[0], int(fields[19])
+    except Exception:
+        return None
+
+
 def is_process_running(pidfile: Path, expected_cmd_substr: str = None):
     """Return True if the PID exists and (optionally) matches an expected command substring.
     On Linux, verifies /proc/<pid>/cmdline contains expected_cmd_substr. This prevents stale pidfiles.
+    Once verified, the (pid, starttime) pair is remembered so later calls skip the cmdline read.
+    Zombies (e.g. a crashed child of start_process not yet reaped) count as not running.
     """
     pid = get_pid_from_pidfile(pidfile)
     if not pid:
@@ -268,11 +739,21 @@ def is_process_running(pidfile: Path, expected_cmd_substr: str = None):
     except Exception:
         return False
     if expected_cmd_substr:
+        state = get_proc_state(pid)
+        if state is not None and state[0] == b'Z':
+            return False
+        starttime = state[1] if state is not None else None
+        if starttime is not None and _verified_procs.get((str(pidfile), expected_cmd_substr)) == (pid, starttime):
+            return True
         try:
-            cmdline = Path(f"/proc/{pid}/cmdline").read_text().replace('\x00', ' ')
-            return expected_cmd_substr in cmdline
+            with open(f"/proc/{pid}/cmdline", 'rb') as f:
+                cmdline = f.read().replace(b'\x00', b' ')
         except Exception:
             return False
+        if expected_cmd_substr.encode() not in cmdline:
+            return False
+        if starttime is not None:
+            _verified_procs[(str(pidfile), expected_cmd_substr)] = (pid, starttime)
     return True
 
 
@@ -293,6 +774,33 @@ def start_process(cmd: list, pidfile: Path):
         return False
 
 
+def wait_for_exit(pid: int, timeout: float) -> bool:
+    """Wait up to timeout seconds for pid to exit. On Linux a pidfd is polled, so
+    this wakes as soon as the process terminates; elsewhere fall back to kill(pid, 0).
+    """
+    if hasattr(os, 'pidfd_open'):
+        try:
+            fd = os.pidfd_open(pid)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            fd = None
+        if fd is not None:
+            try:
+                readable, _, _ = select.select([fd], [], [], timeout)
+                return bool(readable)
+            finally:
+                os.close(fd)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return True
+        time.sleep(0.2)
+    return False
+
+
 def stop_process(pidfile: Path):
     try:
         if not pidfile.exists():
@@ -310,12 +818,7 @@ def stop_process(pidfile: Path):
                 logger.warning('Failed to SIGTERM pid/pgrp=%s', pid)
 
         # wait a short time for process to exit
-        for _ in range(10):
-            try:
-                os.kill(pid, 0)
-                time.sleep(0.2)
-            except Exception:
-                break
+        wait_for_exit(pid, 2.0)
 
         # If still running, force kill the group
         try:
@@ -361,7 +864,8 @@ def send_command():
 
     cmdfile = WEB_COMMAND_FILE
     try:
-        cmdfile.write_text(json.dumps({'action': action, 'ts': time.time()}))
+        cmdfile.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(cmdfile, json_dumps({'action': action, 'ts': time.time()}))
         flash(f'Sent {action} to {target}', 'success')
     except Exception:
         logger.exception('Failed to write command')
@@ -369,19 +873,160 @@ def send_command():
     return redirect(url_for('dashboard'))
 
 
-def trigger_presentation_conversion_async(presentation_path: Path):
-    """Kick off background conversion of a presentation to cached PNG slides."""
-    def _run():
+# Single long-lived converter thread per process; uploads just enqueue a path.
+# Every gunicorn worker runs one, so warm_cache() takes a cross-process lock: only one
+# conversion runs at a time and LibreOffice instances never fight over the same user
+# profile. A worker that waited finds the decks already cached and skips them.
+_convert_queue = queue.Queue()
+_convert_pending = set()
+_convert_lock = threading.Lock()
+_convert_thread = None
+
+
+def _queue_stale_presentations():
+    """Queue every presentation whose slide cache is missing or out of date
+    (e.g. uploaded over FTP, or converted for another display resolution).
+    """
+    display_size = parse_display_size(read_config().get('display_resolution'))
+    conv = PresentationConverter(CACHE_DIR, display_size)
+    try:
+        with os.scandir(PRESENTATIONS_DIR) as it:
+            paths = [Path(entry.path) for entry in it if entry.is_file()]
+    except FileNotFoundError:
+        return
+    for path in sorted(paths):
+        if path.suffix.lower() in ALLOWED_PPT_EXTENSIONS and not conv.is_cached(path):
+            trigger_presentation_conversion_async(path)
+
+
+def _presentation_converter_loop():
+    sweep_cache_trash()
+    try:
+        _queue_stale_presentations()
+    except Exception:
+        logger.exception('Failed to scan for stale slide caches')
+    while True:
+        # Take everything queued so far so PPTX files can share one LibreOffice run
+        batch = [_convert_queue.get()]
+        while True:
+            try:
+                batch.append(_convert_queue.get_nowait())
+            except queue.Empty:
+                break
+        with _convert_lock:
+            _convert_pending.difference_update(batch)
         try:
-            conv = PresentationConverter(CACHE_DIR)
-            conv.convert_presentation(presentation_path)
+            display_size = parse_display_size(read_config().get('display_resolution'))
+            PresentationConverter(CACHE_DIR, display_size).warm_cache(batch)
         except Exception:
             logger.exception('Background presentation conversion failed')
+        finally:
+            for _ in batch:
+                _convert_queue.task_done()
+
+
+def start_presentation_converter():
+    """Start the shared converter thread once per process. On start it deletes cache
+    folders left in CACHE_TRASH_DIR and queues any presentation whose slides are
+    missing or stale, so players never wait on them.
+    """
+    global _convert_thread
+    with _convert_lock:
+        if _convert_thread is None or not _convert_thread.is_alive():
+            _convert_thread = threading.Thread(target=_presentation_converter_loop, name='presentation-converter', daemon=True)
+            _convert_thread.start()
+
+
+def trigger_presentation_conversion_async(presentation_path: Path):
+    """Queue background conversion of a presentation to cached PNG slides.
+    Jobs run one after another on a shared converter thread; a path that is already
+    waiting in the queue is not queued twice.
+    """
     try:
-        threading.Thread(target=_run, daemon=True).start()
-        logger.info(f"Spawned background converter for: {presentation_path.name}")
+        with _convert_lock:
+            if presentation_path in _convert_pending:
+                logger.info(f"Conversion already queued for: {presentation_path.name}")
+                return
+            _convert_pending.add(presentation_path)
+        start_presentation_converter()
+        _convert_queue.put(presentation_path)
+        logger.info(f"Queued background conversion for: {presentation_path.name}")
     except Exception:
-        logger.exception('Failed to spawn background conversion thread')
+        logger.exception('Failed to queue background conversion')
+
+
+# Slide cache folders are removed off the request path. A folder is first renamed
+# out of CACHE_DIR (cheap and atomic), so players stop seeing it immediately and a
+# re-upload of the same name can start a fresh cache while the old one is deleted.
+CACHE_TRASH_DIR = CACHE_DIR.parent / '.trash'
+_delete_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='cache-delete')
+
+
+def discard_cache_dir(cache_path: Path):
+    """Detach a slide cache folder and delete it on a background thread.
+    Returns False if there was no folder to delete.
+    """
+    if not cache_path.is_dir():
+        return False
+    CACHE_TRASH_DIR.mkdir(parents=True, exist_ok=True)
+    trash_path = CACHE_TRASH_DIR / f"{cache_path.name}.{secrets.token_hex(4)}"
+    try:
+        os.replace(cache_path, trash_path)
+    except OSError as e:
+        logger.warning(f"Could not detach cache {cache_path.name}, deleting in place: {e}")
+        trash_path = cache_path
+    _delete_executor.submit(shutil.rmtree, trash_path, ignore_errors=True)
+    return True
+
+
+def sweep_cache_trash():
+    """Delete whatever is left in CACHE_TRASH_DIR, e.g. folders whose background delete
+    was cut short by a worker restart or failed. Another worker may be deleting the
+    same folder; rmtree(ignore_errors=True) tolerates that.
+    """
+    try:
+        with os.scandir(CACHE_TRASH_DIR) as it:
+            leftovers = [(entry.path, entry.is_dir(follow_symlinks=False)) for entry in it]
+    except FileNotFoundError:
+        return
+    for path, is_dir in leftovers:
+        if is_dir:
+            _delete_executor.submit(shutil.rmtree, path, ignore_errors=True)
+        else:
+            Path(path).unlink(missing_ok=True)
+    if leftovers:
+        logger.info(f"Deleting {len(leftovers)} leftover item(s) from {CACHE_TRASH_DIR}")
+
+
+def transcode_output_path(src: Path) -> Path:
+    """Unique temp output next to src, so concurrent transcodes never share a file."""
+    fd, name = tempfile.mkstemp(dir=VIDEOS_DIR, prefix=f'{src.stem}_', suffix='_h264.mp4')
+    os.close(fd)
+    return Path(name)
+
+
+def transcode_would_overwrite(src: Path) -> bool:
+    """True if optimizing src would replace a different, existing <stem>.mp4
+    (e.g. clip.mov next to clip.mp4); such sources are skipped."""
+    final = VIDEOS_DIR / (src.stem + '.mp4')
+    return final != src and final.exists()
+
+
+def replace_with_transcoded(src: Path, tmp_out: Path):
+    """Move a finished transcode over <stem>.mp4 with one atomic os.replace().
+    A non-.mp4 source is removed afterwards. Returns (old_size, new_size) in bytes.
+    """
+    old_size = src.stat().st_size
+    new_size = tmp_out.stat().st_size
+    final = VIDEOS_DIR / (src.stem + '.mp4')
+    os.replace(tmp_out, final)
+    if src != final:
+        try:
+            src.unlink()
+        except FileNotFoundError:
+            pass
+    logger.info('Optimized %s: %s -> %s', src.name, fmt_bytes(old_size), fmt_bytes(new_size))
+    return old_size, new_size
 
 
 @app.route('/optimize/video/<filename>', methods=['POST'])
@@ -397,8 +1042,12 @@ def optimize_single_video(filename):
         if not src.exists():
             flash('Video not found.', 'error')
             return redirect(url_for('dashboard'))
+        if transcode_would_overwrite(src):
+            logger.warning('Skipping %s: optimizing it would overwrite %s.mp4', src.name, src.stem)
+            flash(f'Not optimized: {src.stem}.mp4 already exists.', 'warning')
+            return redirect(url_for('dashboard'))
 
-        tmp_out = src.with_suffix('').with_name(src.stem + '_h264.mp4')
+        tmp_out = transcode_output_path(src)
         ok = transcode_video(src, tmp_out)
         if not ok:
             if tmp_out.exists():
@@ -409,22 +1058,14 @@ def optimize_single_video(filename):
             flash('Transcoding failed.', 'error')
             return redirect(url_for('dashboard'))
 
-        # Replace original file atomically
-        backup = src.with_suffix(src.suffix + '.bak')
         try:
-            src.rename(backup)
-            tmp_out.rename(VIDEOS_DIR / (src.stem + '.mp4'))
-            # Remove backup on success
-            try:
-                backup.unlink()
-            except Exception:
-                pass
+            old_size, new_size = replace_with_transcoded(src, tmp_out)
         except Exception as e:
             logger.exception('Failed to replace original after transcoding')
             flash('File replace failed after transcoding.', 'error')
             return redirect(url_for('dashboard'))
 
-        flash(f'Optimized video: {filename}', 'success')
+        flash(f'Optimized video: {filename} ({fmt_bytes(old_size)} -> {fmt_bytes(new_size)})', 'success')
         return redirect(url_for('dashboard'))
     except Exception as e:
         logger.error('Optimize video error: %s', e, exc_info=True)
@@ -435,7 +1076,9 @@ def optimize_single_video(filename):
 @app.route('/optimize/videos', methods=['POST'])
 @login_required
 def optimize_all_videos():
-    """Batch optimize all videos; skips files already .mp4 to avoid endless churn.
+    """Batch optimize all videos, re-encoding each one (.mp4 included) to <stem>.mp4.
+    A non-.mp4 source is skipped when a separate <stem>.mp4 already exists, so it never
+    overwrites that file; of several such sources only the first is optimized.
     """
     if not is_ffmpeg_available():
         flash('ffmpeg is not installed on this system.', 'error')
@@ -443,40 +1086,91 @@ def optimize_all_videos():
 
     optimized = 0
     failed = 0
+    skipped = 0
     try:
-        for file in sorted(VIDEOS_DIR.glob('*')):
-            if not file.is_file():
+        with os.scandir(VIDEOS_DIR) as it:
+            candidates = sorted(
+                Path(entry.path) for entry in it
+                if entry.is_file()
+                and os.path.splitext(entry.name)[1].lower() in ALLOWED_VIDEO_EXTENSIONS
+            )
+        # ffmpeg runs as a subprocess, so threads are enough to keep several cores busy.
+        # Each transcode is limited to one ffmpeg thread to avoid oversubscribing the CPU.
+        workers = max(1, (os.cpu_count() or 2) // 2)
+        # Sources that would end up as the same new <stem>.mp4 (clip.mov + clip.mkv) are
+        # not transcoded concurrently; only the first one is optimized this run
+        finals = set()
+        jobs = []
+        for file in candidates:
+            if transcode_would_overwrite(file):
+                logger.warning('Skipping %s: optimizing it would overwrite %s.mp4', file.name, file.stem)
+                skipped += 1
                 continue
-            # Only attempt for common video formats not already optimized
-            if file.suffix.lower() not in ALLOWED_VIDEO_EXTENSIONS:
+            if file.stem in finals:
+                logger.warning('Skipping %s: another file already maps to %s.mp4', file.name, file.stem)
+                skipped += 1
                 continue
-            # Create output path
-            out = file.with_suffix('').with_name(file.stem + '_h264.mp4')
-            ok = transcode_video(file, out)
-            if ok:
-                try:
-                    backup = file.with_suffix(file.suffix + '.bak')
-                    file.rename(backup)
-                    out.rename(VIDEOS_DIR / (file.stem + '.mp4'))
+            finals.add(file.stem)
+            jobs.append(file)
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {}
+            for file in jobs:
+                out = transcode_output_path(file)
+                futures[ex.submit(transcode_video, file, out, 1)] = (file, out)
+            # Replace originals on this thread as each transcode finishes
+            for fut in as_completed(futures):
+                file, out = futures[fut]
+                if not fut.result():
+                    failed += 1
                     try:
-                        backup.unlink()
-                    except Exception:
+                        out.unlink()
+                    except FileNotFoundError:
                         pass
+                    continue
+                try:
+                    replace_with_transcoded(file, out)
                     optimized += 1
                 except Exception:
                     logger.exception('Post-transcode replace failed for %s', file.name)
                     failed += 1
-            else:
-                failed += 1
     except Exception:
         logger.exception('Batch optimize encountered an error')
         flash('Batch optimize failed (see logs).', 'error')
         return redirect(url_for('dashboard'))
 
-    flash(f'Optimize complete. OK: {optimized}, Failed: {failed}', 'success' if failed == 0 else 'warning')
+    flash(f'Optimize complete. OK: {optimized}, Failed: {failed}, Skipped: {skipped}', 'success' if failed == 0 else 'warning')
     return redirect(url_for('dashboard'))
 
 
+def _get_upload_session(session_id, content_type, filename):
+    """Return the upload session for session_id, creating it when session_id is None.
+    Expired sessions are evicted here; their temp dirs are left alone because another
+    worker may still be writing to them.
+    """
+    now = time.time()
+    with _upload_sessions_lock:
+        for sid in [sid for sid, sess in UPLOAD_SESSIONS.items() if now - sess['last_seen'] > UPLOAD_SESSION_TTL]:
+            UPLOAD_SESSIONS.pop(sid, None)
+        sess = UPLOAD_SESSIONS.get(session_id) if session_id else None
+        if sess is not None and sess['content_type'] == content_type:
+            sess['last_seen'] = now
+            return session_id, sess
+    if session_id is None:
+        session_id = secrets.token_hex(8)
+    sess = {
+        'safe_name': secure_filename(filename),
+        'tmp_dir': UPLOAD_TMP_DIR / session_id,
+        'state_dir': RUNTIME_DIR / 'uploads' / session_id,
+        'content_type': content_type,
+        'last_seen': now,
+    }
+    sess['tmp_dir'].mkdir(parents=True, exist_ok=True)
+    sess['state_dir'].mkdir(parents=True, exist_ok=True)
+    with _upload_sessions_lock:
+        UPLOAD_SESSIONS[session_id] = sess
+    return session_id, sess
+
+
 @app.route('/upload_chunk/<content_type>', methods=['POST'])
 @login_required
 def upload_chunk(content_type):
@@ -485,9 +1179,16 @@ def upload_chunk(content_type):
     - filename: original filename
     - index: zero-based chunk index
     - total: total number of chunks
-    The server writes chunks to UPLOAD_TMP_DIR/<secure_filename(filename)>/part_<index>
-    When the last chunk is received, the server assembles the parts into the final file
-    and triggers the same background conversion logic used by the normal upload endpoint.
+    - chunk_size: size in bytes of every chunk except possibly the last
+    - session_id: value returned for chunk 0; required for every later (or resent) chunk
+    Chunk 0 opens an upload session (see _get_upload_session) so later chunks skip
+    secure_filename() and mkdir. Each chunk is written at offset index * chunk_size of
+    UPLOAD_TMP_DIR/<session_id>/assembled.bin, and the received indexes are tracked in
+    a small received.json sidecar (updated under a flock) kept on tmpfs (RUNTIME_DIR)
+    when available. Once every index in range(total) has been received the file is renamed
+    into place (no reassembly pass) and the same background conversion logic used by
+    the normal upload endpoint is triggered. If the last chunk arrives while earlier ones
+    are missing, 409 is returned with their indexes and the session is kept for retries.
     """
     if content_type not in ('video', 'presentation'):
         return jsonify({'ok': False, 'error': 'invalid content type'}), 400
@@ -500,20 +1201,57 @@ def upload_chunk(content_type):
     try:
         index = int(request.form.get('index', 0))
         total = int(request.form.get('total', 1))
+        chunk_size = int(request.form.get('chunk_size', UPLOAD_CHUNK_SIZE))
     except Exception:
         return jsonify({'ok': False, 'error': 'invalid index/total'}), 400
+    if index < 0 or total < 1 or chunk_size < 1:
+        return jsonify({'ok': False, 'error': 'invalid index/total'}), 400
+
+    session_id = request.form.get('session_id') or None
+    if session_id is None:
+        # Only chunk 0 may open a session; a resent chunk 0 carries its session_id
+        if index != 0:
+            return jsonify({'ok': False, 'error': 'invalid upload session'}), 400
+    elif len(session_id) != 16 or not all(c in '0123456789abcdef' for c in session_id):
+        return jsonify({'ok': False, 'error': 'invalid upload session'}), 400
 
-    safe_name = secure_filename(filename)
-    tmp_dir = UPLOAD_TMP_DIR / safe_name
     try:
-        tmp_dir.mkdir(parents=True, exist_ok=True)
-        part_path = tmp_dir / f'part_{index:06d}'
-        # Save chunk
-        file.save(str(part_path))
+        session_id, sess = _get_upload_session(session_id, content_type, filename)
+        safe_name = sess['safe_name']
+        tmp_dir = sess['tmp_dir']
+        assembled_path = tmp_dir / 'assembled.bin'
+        received_path = sess['state_dir'] / 'received.json'
+
+        # Write chunk in place. Never truncate: chunks of one session may be written
+        # concurrently by other threads or workers, each through its own descriptor.
+        fd = os.open(assembled_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            write_file_at(file.stream, fd, index * chunk_size)
+        finally:
+            os.close(fd)
+        with open(sess['state_dir'] / 'received.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                received = set(json_loads(received_path.read_bytes()))
+            except Exception:
+                received = set()
+            expected = set(range(total))
+            # Only the request that completes the set finalizes, whatever order chunks arrive in
+            finalize = not expected <= received
+            received.add(index)
+            received_path.write_bytes(json_dumps(sorted(received)))
+            missing = sorted(expected - received)
+            finalize = finalize and not missing
         logger.info(f'Received chunk {index+1}/{total} for {safe_name}')
 
-        # If last chunk, assemble
-        if index + 1 >= total:
+        if missing and index + 1 >= total:
+            # Keep the session so the client can resend the missing chunks
+            logger.warning(f'Missing chunk(s) {missing[:10]} while assembling {safe_name}')
+            return jsonify({'ok': False, 'error': 'missing chunks', 'missing': missing,
+                            'index': index, 'total': total, 'session_id': session_id}), 409
+
+        # Once every chunk is in, move the assembled file into place
+        if finalize:
             # Determine final path
             if content_type == 'video':
                 target_dir = VIDEOS_DIR
@@ -522,21 +1260,15 @@ def upload_chunk(content_type):
             target_dir.mkdir(parents=True, exist_ok=True)
             final_path = target_dir / safe_name
 
-            # Assemble parts in order
-            with final_path.open('wb') as fout:
-                for i in range(total):
-                    part_file = tmp_dir / f'part_{i:06d}'
-                    if not part_file.exists():
-                        logger.warning(f'Missing chunk {i} while assembling {safe_name}')
-                        continue
-                    with part_file.open('rb') as fin:
-                        shutil.copyfileobj(fin, fout)
-
+            os.replace(assembled_path, final_path)
             logger.info(f'Assembled upload to {final_path}')
 
-            # cleanup parts
+            # cleanup session and sidecar
+            with _upload_sessions_lock:
+                UPLOAD_SESSIONS.pop(session_id, None)
             try:
                 shutil.rmtree(tmp_dir)
+                shutil.rmtree(sess['state_dir'], ignore_errors=True)
             except Exception:
                 logger.exception('Failed to cleanup tmp upload dir')
 
@@ -547,7 +1279,7 @@ def upload_chunk(content_type):
                 except Exception:
                     logger.exception('Failed to start background conversion for chunked upload')
 
-        return jsonify({'ok': True, 'index': index, 'total': total})
+        return jsonify({'ok': True, 'index': index, 'total': total, 'session_id': session_id})
     except Exception:
         logger.exception('Chunk upload failed')
         return jsonify({'ok': False, 'error': 'server error'}), 500
@@ -563,7 +1295,7 @@ def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        if username in USERS and check_password_hash(USERS[username], password):
+        if verify_password(username, password):
             session['username'] = username
             flash('Login successful!', 'success')
             return redirect(url_for('dashboard'))
@@ -573,7 +1305,9 @@ def login():
 
 @app.route('/logout')
 def logout():
-    session.pop('username', None)
+    username = session.pop('username', None)
+    if username:
+        forget_verified_logins(username)
     flash('Logged out', 'success')
     return redirect(url_for('login'))
 
@@ -582,49 +1316,40 @@ def logout():
 def dashboard():
     videos = []
     presentations = []
-    playlist = read_playlist()
-    
+    start_presentation_converter()
+    state = load_playlist()
+    playlist = state['raw']
+    playlist_set = state['names']
+
     # Auto-cleanup: filter out orphaned items and save if any were removed
-    cleaned_playlist, removed_items = filter_valid_playlist(playlist)
-    if removed_items:
-        write_playlist(cleaned_playlist)
-        playlist = cleaned_playlist
-        flash(f"Removed {len(removed_items)} orphaned item(s) from playlist: {', '.join(removed_items[:3])}{'...' if len(removed_items) > 3 else ''}", 'warning')
-    
-    playlist_set = playlist_names_set(playlist)
+    if not playlist_set <= content_names():
+        cleaned_playlist, removed_items = filter_valid_playlist(state['normalized'])
+        if removed_items:
+            write_playlist(cleaned_playlist, normalized=True)
+            playlist = cleaned_playlist
+            playlist_set = load_playlist()['names']
+            flash(f"Removed {len(removed_items)} orphaned item(s) from playlist: {', '.join(removed_items[:3])}{'...' if len(removed_items) > 3 else ''}", 'warning')
     
     try:
         VIDEOS_DIR.mkdir(parents=True, exist_ok=True)
         PRESENTATIONS_DIR.mkdir(parents=True, exist_ok=True)
-        
-        if VIDEOS_DIR.exists():
-            for file in sorted(VIDEOS_DIR.iterdir()):
-                if file.is_file() and file.suffix.lower() in ALLOWED_VIDEO_EXTENSIONS:
-                    videos.append({
-                        'name': file.name,
-                        'size': get_file_size(file),
-                        'type': 'video',
-                        'format': get_file_format(file),
-                        'in_playlist': file.name in playlist_set
-                    })
-        
-        if PRESENTATIONS_DIR.exists():
-            for file in sorted(PRESENTATIONS_DIR.iterdir()):
-                if file.is_file() and file.suffix.lower() in ALLOWED_PPT_EXTENSIONS:
-                    presentations.append({
-                        'name': file.name,
-                        'size': get_file_size(file),
-                        'type': 'presentation',
-                        'format': get_file_format(file),
-                        'in_playlist': file.name in playlist_set
-                    })
-        
+
+        key = (change_token('videos', VIDEOS_DIR), change_token('presentations', PRESENTATIONS_DIR),
+               change_token('playlist', PLAYLIST_FILE))
+        cached = _DIR_CACHE.get('entry')
+        if cached and cached[0] == key:
+            videos, presentations = cached[1], cached[2]
+        else:
+            videos = get_listing(VIDEOS_DIR, ALLOWED_VIDEO_EXTENSIONS, 'video', key[0], playlist_set)
+            presentations = get_listing(PRESENTATIONS_DIR, ALLOWED_PPT_EXTENSIONS, 'presentation', key[1], playlist_set)
+            _DIR_CACHE['entry'] = (key, videos, presentations)
+
     except Exception as e:
         logger.error(f"Error loading dashboard: {e}", exc_info=True)
         flash('Error loading files', 'error')
     
     # read current config and process status
-    web_running = is_process_running(WEB_PLAYER_PID, 'web_player.py')
+    web_running = is_process_running(WEB_PLAYER_PID, WEB_PLAYER_CMD_MATCH)
 
     return render_template('dashboard.html',
                         videos=videos,
@@ -643,25 +1368,18 @@ def toggle_playlist(content_type, filename):
         return jsonify({'ok': False, 'error': 'invalid content type'}), 400
     
     try:
-        raw = read_playlist()
-        items = normalize_playlist_to_objects(raw)
-
-        # Check if filename present
-        found = None
-        for it in items:
-            if it.get('name') == filename:
-                found = it
-                break
+        state = load_playlist()
 
-        if found:
+        # Membership is a set lookup on the cached names; entries are reused as-is
+        if filename in state['names']:
             # remove all entries matching this name
-            items = [it for it in items if it.get('name') != filename]
+            items = [it for it in state['normalized'] if it['name'] != filename]
             in_playlist = False
         else:
-            items.append({'name': filename, 'repeats': 1})
+            items = state['normalized'] + [{'name': filename, 'repeats': 1}]
             in_playlist = True
 
-        ok = write_playlist(items)
+        ok = write_playlist(items, normalized=True)
         if ok:
             return jsonify({'ok': True, 'in_playlist': in_playlist, 'filename': filename})
         else:
@@ -676,8 +1394,7 @@ def toggle_playlist(content_type, filename):
 def api_playlist_order_get():
     """Return normalized playlist (ordered) as list of objects {name, repeats}."""
     try:
-        raw = read_playlist()
-        items = normalize_playlist_to_objects(raw)
+        items = load_playlist()['normalized']
         return jsonify({'ok': True, 'playlist': items})
     except Exception:
         logger.exception('Failed to return playlist order')
@@ -689,25 +1406,14 @@ def api_playlist_order_get():
 def api_playlist_order_post():
     """Accept a JSON array of objects {name, repeats} and save as the playlist order."""
     try:
-        data = request.get_json()
-        if not isinstance(data, list):
-            return jsonify({'ok': False, 'error': 'expected a JSON array'}), 400
-
-        normalized = []
-        for entry in data:
-            if isinstance(entry, str):
-                normalized.append({'name': entry, 'repeats': 1})
-            elif isinstance(entry, dict):
-                name = entry.get('name')
-                if not name:
-                    continue
-                try:
-                    repeats = int(entry.get('repeats', 1))
-                except Exception:
-                    repeats = 1
-                normalized.append({'name': name, 'repeats': max(1, repeats)})
-
-        ok = write_playlist(normalized)
+        normalized = decode_playlist_entries(request.get_data()) if request.is_json else None
+        if normalized is None:
+            data = request.get_json()
+            if not isinstance(data, list):
+                return jsonify({'ok': False, 'error': 'expected a JSON array'}), 400
+            normalized = normalize_playlist_order(data)
+
+        ok = write_playlist(normalized, normalized=True)
         if ok:
             return jsonify({'ok': True, 'playlist': normalized})
         else:
@@ -721,7 +1427,7 @@ def api_playlist_order_post():
 @login_required
 def start_web_player():
     # Start the web player Flask app in background
-    if is_process_running(WEB_PLAYER_PID, 'web_player.py'):
+    if is_process_running(WEB_PLAYER_PID, WEB_PLAYER_CMD_MATCH):
         flash('Web player already running', 'error')
         return redirect(url_for('dashboard'))
     python = sys.executable or 'python3'
@@ -778,19 +1484,36 @@ def upload_file(content_type):
         
         # NEW: If presentation exists, delete old cache first
         if content_type == 'presentation' and filepath.exists():
-            cache_path = CACHE_DIR / filepath.stem
-            if cache_path.exists():
-                shutil.rmtree(cache_path)
+            if discard_cache_dir(CACHE_DIR / filepath.stem):
                 logger.info(f"Deleted old cache for: {filename}")
         
         target_dir.mkdir(parents=True, exist_ok=True)
         
         logger.info(f"Saving {filename}...")
-        file.save(str(filepath))
+        # Hard-link the spool file (see UploadRequest) or, failing that, copy it with
+        # append_file (sendfile on Linux) into a sibling temp file; then rename over the
+        # target so a replaced file is swapped atomically
+        tmp_path = filepath.with_name(filepath.name + '.part')
+        try:
+            spool_name = getattr(file.stream, 'name', None)
+            try:
+                file.stream.flush()
+                os.link(spool_name, tmp_path)
+                # Temp files are created 0600; give the content file normal permissions
+                os.chmod(tmp_path, 0o644)
+            except (TypeError, AttributeError, OSError):
+                tmp_path.unlink(missing_ok=True)
+                file.stream.seek(0)
+                with tmp_path.open('wb') as dst:
+                    append_file(file.stream, dst)
+            os.replace(tmp_path, filepath)
+        except Exception:
+            tmp_path.unlink(missing_ok=True)
+            raise
         
         if filepath.exists():
             elapsed = time.time() - start_time
-            file_size = get_file_size(filepath)
+            file_size = fmt_bytes(filepath.stat().st_size)
             flash(f'✓ Uploaded: {filename} ({file_size}) in {elapsed:.1f}s', 'success')
             logger.info(f"Upload complete: {filename} ({file_size}) in {elapsed:.1f}s")
             # If presentation, trigger conversion in background
@@ -821,12 +1544,11 @@ def delete_file(content_type, filename):
             # NEW: Delete cache folder for presentations
             if content_type == 'presentation':
                 cache_path = CACHE_DIR / filepath.stem
-                if cache_path.exists() and cache_path.is_dir():
-                    try:
-                        shutil.rmtree(cache_path)
+                try:
+                    if discard_cache_dir(cache_path):
                         logger.info(f"✓ Deleted cache folder: {cache_path.name}")
-                    except Exception as cache_error:
-                        logger.warning(f"Failed to delete cache: {cache_error}")
+                except Exception as cache_error:
+                    logger.warning(f"Failed to delete cache: {cache_error}")
             
             # Delete the file
             filepath.unlink()
@@ -841,6 +1563,54 @@ def delete_file(content_type, filename):
     
     return redirect(url_for('dashboard'))
 
+# Host facts that never change while the process runs
+HOSTNAME = platform.node()
+PLATFORM_NAME = platform.system()
+
+# Slow-changing stats are re-read at most once per TTL (seconds)
+DISK_STATS_TTL = 10
+TEMP_STATS_TTL = 2
+THERMAL_ZONE_TEMP = Path('/sys/class/thermal/thermal_zone0/temp')  # millidegrees C; the SoC sensor on a Pi
+_stats_cache = {}
+_stats_cache_lock = threading.Lock()
+
+
+def cached_stat(key, ttl, fn):
+    """Return fn() memoized for ttl seconds under key (per process)."""
+    now = time.monotonic()
+    with _stats_cache_lock:
+        hit = _stats_cache.get(key)
+        if hit and now - hit[0] < ttl:
+            return hit[1]
+    value = fn()
+    with _stats_cache_lock:
+        _stats_cache[key] = (now, value)
+    return value
+
+
+def read_temperature_c():
+    """Best-effort CPU temperature in °C, or None. Reads thermal_zone0 directly and
+    only falls back to enumerating psutil sensors where that file doesn't exist.
+    """
+    try:
+        return round(int(THERMAL_ZONE_TEMP.read_bytes()) / 1000, 1)
+    except (OSError, ValueError):
+        pass
+    temps = psutil.sensors_temperatures()
+    if not temps:
+        return None
+    # Try to get CPU temp from common sources
+    for name, entries in temps.items():
+        if name.lower() in ('cpu', 'coretemp', 'k10temp', 'acpitz'):
+            if entries:
+                return round(entries[0].current, 1)
+    # If no CPU temp found, use first available
+    first_key = next(iter(temps))
+    if temps[first_key]:
+        return round(temps[first_key][0].current, 1)
+    return None
+
+
 @app.route('/api/system_stats')
 @login_required
 def api_system_stats():
@@ -852,9 +1622,9 @@ def api_system_stats():
     try:
         stats = {}
         
-        # CPU usage
+        # CPU usage since the previous call (non-blocking; seeded at import)
         try:
-            stats['cpu_percent'] = psutil.cpu_percent(interval=0.1)
+            stats['cpu_percent'] = psutil.cpu_percent(interval=None)
         except Exception:
             stats['cpu_percent'] = None
         
@@ -867,9 +1637,9 @@ def api_system_stats():
         except Exception:
             stats['ram_percent'] = None
         
-        # Disk usage (root /)
+        # Disk usage (root /); statvfs is slow on SD cards, so it is cached briefly
         try:
-            disk = psutil.disk_usage('/')
+            disk = cached_stat('disk', DISK_STATS_TTL, lambda: psutil.disk_usage('/'))
             stats['disk_percent'] = disk.percent
             stats['disk_used_gb'] = round(disk.used / (1024**3), 2)
             stats['disk_total_gb'] = round(disk.total / (1024**3), 2)
@@ -879,25 +1649,13 @@ def api_system_stats():
         # Temperature (try Linux thermal zones or system temp)
         stats['temp_c'] = None
         try:
-            temps = psutil.sensors_temperatures()
-            if temps:
-                # Try to get CPU temp from common sources
-                for name, entries in temps.items():
-                    if name.lower() in ('cpu', 'coretemp', 'k10temp', 'acpitz'):
-                        if entries:
-                            stats['temp_c'] = round(entries[0].current, 1)
-                            break
-                # If no CPU temp found, use first available
-                if stats['temp_c'] is None and temps:
-                    first_key = next(iter(temps))
-                    if temps[first_key]:
-                        stats['temp_c'] = round(temps[first_key][0].current, 1)
+            stats['temp_c'] = cached_stat('temp', TEMP_STATS_TTL, read_temperature_c)
         except Exception:
             pass
         
         # System info
-        stats['hostname'] = platform.node()
-        stats['platform'] = platform.system()
+        stats['hostname'] = HOSTNAME
+        stats['platform'] = PLATFORM_NAME
         
         return jsonify({'ok': True, 'stats': stats})
     except Exception:
@@ -926,8 +1684,10 @@ if __name__ == '__main__':
     logger.info(f"System stats (psutil): {'✓ Available' if HAS_PSUTIL else '✗ Not installed'}")
     logger.info("=" * 60)
     logger.info("NOTE: For production use, run with gunicorn:")
-    logger.info("  gunicorn -w 2 -b 0.0.0.0:5000 --timeout 300 dashboard:app")
+    logger.info("  gunicorn -w 2 -k gthread --threads 8 -b 0.0.0.0:5000 --timeout 300 dashboard:app")
     logger.info("=" * 60)
     
+    # Exit through sys.exit on SIGTERM so atexit hooks (the LibreOffice listener) run
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     # Enable threading for concurrent requests (development mode only)
     app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
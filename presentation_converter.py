@@ -2,81 +2,468 @@
 """
 Presentation conversion utilities
 - Converts PPTX/PDF presentations to cached PNG slides
-- Uses LibreOffice for PPTX->PDF and ImageMagick for PDF->PNG
+- Uses LibreOffice for PPTX->PDF and PyMuPDF, pdftoppm or ImageMagick for PDF->PNG
 """
 
+import os
+import atexit
+import fcntl
+import hashlib
+import multiprocessing
 import subprocess
+import shutil
+import signal
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import lru_cache
 from pathlib import Path
 import logging
 
 logger = logging.getLogger(__name__)
 
+SLIDE_DPI = 150  # ImageMagick fallback rasterizes at this density before resizing
+DISPLAY_SIZE = (1920, 1080)  # default target when config.json has no "display_resolution"
+PALETTE_MAX_COLORS = 4096  # slides with more distinct colours (photos, gradients) stay RGB
+
+# Persistent LibreOffice listener driven through unoconv (used only when unoconv is installed).
+# It gets its own profile so a plain `libreoffice --convert-to` fallback never collides with it.
+# One listener is shared by every process (gunicorn workers); OFFICE_LISTENER_PID records it.
+# It listens on a named pipe (a Unix socket), not TCP, so it isn't reachable from the network
+# and the name is per user.
+OFFICE_PIPE_NAME = f"signage-{os.getuid()}"
+OFFICE_CONNECTION = f"pipe,name={OFFICE_PIPE_NAME};urp;StarOffice.ComponentContext"
+OFFICE_PROFILE_DIR = Path.home() / 'signage' / 'cache' / 'lo-profile'
+OFFICE_LISTENER_PID = OFFICE_PROFILE_DIR.parent / 'lo-listener.pid'
+OFFICE_LISTENER_LOCK = OFFICE_PROFILE_DIR.parent / 'lo-listener.lock'
+_office_listener = {'proc': None, 'atexit': False}  # the listener this process spawned, to reap and stop it
+_office_listener_lock = threading.Lock()
+
+
+def _office_listener_pid():
+    """The pid in OFFICE_LISTENER_PID if it is a live soffice using our profile (possibly
+    still booting before it accepts connections), else None."""
+    try:
+        pid = int(OFFICE_LISTENER_PID.read_text().strip())
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read()
+    except (OSError, ValueError):
+        return None
+    return pid if str(OFFICE_PROFILE_DIR).encode() in cmdline else None
+
+
+def stop_office_listener():
+    """Terminate the listener in OFFICE_LISTENER_PID if this process started it.
+    Registered with atexit when a listener is started, so it goes away with the worker
+    (and the service); the next conversion in any process simply starts a new one.
+    """
+    with _office_listener_lock:
+        proc = _office_listener['proc']
+        if proc is None or proc.poll() is not None:
+            return
+        if _office_listener_pid() == proc.pid:
+            OFFICE_LISTENER_PID.unlink(missing_ok=True)
+        try:
+            os.killpg(proc.pid, signal.SIGTERM)  # its own session: soffice and oosplash
+            proc.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        _office_listener['proc'] = None
+        logger.info(f"Stopped LibreOffice listener pid={proc.pid}")
+
+
+def ensure_office_listener() -> bool:
+    """Make sure one headless soffice is accepting UNO connections on OFFICE_CONNECTION,
+    so conversions skip LibreOffice's multi-second startup. The listener is shared by
+    all processes: a flock serializes the check-and-start, and it is detached into its
+    own session so other workers can keep using it. It is stopped when the process
+    that started it exits (see stop_office_listener).
+    Returns False if unoconv or soffice is not available.
+    """
+    soffice = shutil.which("soffice") or shutil.which("libreoffice")
+    if not soffice or not shutil.which("unoconv"):
+        return False
+    with _office_listener_lock:
+        proc = _office_listener['proc']
+        if proc is not None and proc.poll() is not None:
+            _office_listener['proc'] = None  # reaped; it exited
+        # Only trust a listener we recorded: unoconv retries the connection while it boots
+        if _office_listener_pid() is not None:
+            return True
+        OFFICE_PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(OFFICE_LISTENER_LOCK, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Another process may have started it while we waited
+            if _office_listener_pid() is not None:
+                return True
+            cmd = [soffice, "--headless", "--invisible", "--nologo", "--norestore", "--nofirststartwizard",
+                   f"-env:UserInstallation={OFFICE_PROFILE_DIR.as_uri()}", f"--accept={OFFICE_CONNECTION}"]
+            try:
+                proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                        start_new_session=True)
+            except OSError as e:
+                logger.warning(f"Could not start LibreOffice listener: {e}")
+                return False
+            OFFICE_LISTENER_PID.write_text(str(proc.pid))
+            if not _office_listener['atexit']:
+                atexit.register(stop_office_listener)
+                _office_listener['atexit'] = True
+            _office_listener['proc'] = proc
+        logger.info(f"Started LibreOffice listener pid={proc.pid}")
+        return True
+
+
+# Optional renderers are imported on first use: PyMuPDF alone adds ~0.1 s and tens of MB
+# to every dashboard worker, while conversions are rare.
+@lru_cache(maxsize=None)
+def get_fitz():
+    """PyMuPDF renders pages in-process (no ImageMagick -> Ghostscript fork chain); None if missing."""
+    try:
+        import pymupdf as fitz
+    except ImportError:
+        try:
+            import fitz
+        except ImportError:
+            return None
+    return fitz
+
+
+@lru_cache(maxsize=None)
+def get_pil_image():
+    """Pillow's Image module, used to re-encode flat-colour slides as palette PNGs; None if missing."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    return Image
+
+
+@lru_cache(maxsize=None)
+def get_blake3():
+    """The blake3 package's hasher (SIMD-accelerated), or None to fall back to hashlib.blake2b."""
+    try:
+        from blake3 import blake3
+    except ImportError:
+        return None
+    return blake3
+
+
+def hash_slides(png_files) -> str:
+    """Digest of the rendered slides' bytes, in order; computed once per conversion."""
+    blake3 = get_blake3()
+    h = blake3() if blake3 is not None else hashlib.blake2b(digest_size=16)
+    for png_file in png_files:
+        h.update(png_file.name.encode() + b"\0")
+        with open(png_file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+    return h.hexdigest()
+
+
+def parse_display_size(value):
+    """Parse a "WIDTHxHEIGHT" string into a (width, height) tuple, else DISPLAY_SIZE."""
+    try:
+        width, height = (int(part) for part in str(value).lower().split('x'))
+        if width > 0 and height > 0:
+            return width, height
+    except (TypeError, ValueError):
+        pass
+    return DISPLAY_SIZE
+
+
+def quantize_slide(png_path: Path) -> bool:
+    """Rewrite a slide as a 256-colour palette PNG if it is mostly flat colour.
+    Returns True if the file was rewritten.
+    """
+    Image = get_pil_image()
+    with Image.open(png_path) as img:
+        img = img.convert("RGB")
+        if img.getcolors(PALETTE_MAX_COLORS) is None:
+            return False
+        quantized = img.quantize(256, method=Image.Quantize.FASTOCTREE)
+    tmp_path = png_path.with_name(png_path.name + ".tmp")
+    quantized.save(tmp_path, format="PNG")
+    tmp_path.replace(png_path)
+    return True
+
+
+def _render_page_range(pdf_path: str, start: int, end: int, output_dir: str, size) -> int:
+    """Render pages [start, end) to slide_NNN.png scaled to fit size; runs in a worker process.
+
+    Each worker reopens the PDF because fitz documents can't be shared across processes.
+    """
+    fitz = get_fitz()
+    width, height = size
+    with fitz.open(pdf_path) as doc:
+        for i in range(start, end):
+            page = doc[i]
+            zoom = min(width / page.rect.width, height / page.rect.height)
+            page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).save(os.path.join(output_dir, f"slide_{i + 1:03d}.png"))
+    return end - start
+
 class PresentationConverter:
     """Handles PPTX and PDF to PNG conversion"""
 
-    def __init__(self, cache_dir: Path):
+    def __init__(self, cache_dir: Path, display_size=DISPLAY_SIZE):
         self.cache_dir = Path(cache_dir)
+        # Slides are rendered to fit this (width, height) so players show them unscaled
+        self.display_size = tuple(display_size)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
     def get_cache_path(self, presentation_file: Path) -> Path:
         cache_name = presentation_file.stem
         return self.cache_dir / cache_name
 
+    # Written after a successful conversion; records what the slides were built from
+    STAMP_NAME = ".src_mtime"
+    # Content digest of the slides, read by the web player instead of stat()ing each slide
+    DIGEST_NAME = ".slides_digest"
+    # Present while freshly rendered slides are being swapped in; players skip the folder
+    # until it's gone. Rendering itself happens in a staging dir, so this is brief.
+    CONVERTING_NAME = ".converting"
+    # Held for a whole warm_cache() run so only one process converts at a time
+    CONVERTER_LOCK_NAME = ".converter.lock"
+
+    def _source_stamp(self, presentation_file: Path) -> str:
+        st = presentation_file.stat()
+        width, height = self.display_size
+        return f"{st.st_mtime_ns}:{st.st_size}:{width}x{height}"
+
     def is_cached(self, presentation_file: Path) -> bool:
+        """True if the cache holds slides rendered from this exact source file
+        (same mtime and size) at the current display size.
+        """
         cache_path = self.get_cache_path(presentation_file)
-        if not cache_path.exists():
+        try:
+            stamp = (cache_path / self.STAMP_NAME).read_text()
+            if stamp != self._source_stamp(presentation_file):
+                return False
+        except OSError:
             return False
-        png_files = list(cache_path.glob("slide_*.png"))
-        return len(png_files) > 0
+        return any(cache_path.glob("slide_*.png"))
+
+    def _write_stamp(self, presentation_file: Path, cache_path: Path):
+        try:
+            png_files = sorted(cache_path.glob("slide_*.png"))
+            (cache_path / self.DIGEST_NAME).write_text(hash_slides(png_files))
+            (cache_path / self.STAMP_NAME).write_text(self._source_stamp(presentation_file))
+        except OSError as e:
+            logger.warning(f"  Could not write cache stamp for {presentation_file.name}: {e}")
+
+    @contextmanager
+    def _converting(self, presentation_file: Path):
+        """Hold an exclusive per-presentation lock (so dashboard workers never render the
+        same deck at once) and yield (cache path, empty staging dir to render into).
+        The old slides stay in the cache path, visible to players, until
+        _publish_slides() swaps the new ones in.
+        """
+        cache_path = self.get_cache_path(presentation_file)
+        cache_path.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / f".{cache_path.name}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            # Beside the slides dir (same filesystem, so os.replace works) but outside it,
+            # so players never list the staging dir as a deck
+            with tempfile.TemporaryDirectory(dir=self.cache_dir.parent, prefix=".render-") as staging:
+                yield cache_path, Path(staging)
+
+    def _publish_slides(self, presentation_file: Path, staging: Path, cache_path: Path):
+        """Move the rendered slides from staging into cache_path, drop trailing slides
+        of a longer previous deck, and stamp the cache. Returns the published slides.
+        """
+        marker = cache_path / self.CONVERTING_NAME
+        marker.touch()
+        try:
+            (cache_path / self.STAMP_NAME).unlink(missing_ok=True)
+            (cache_path / self.DIGEST_NAME).unlink(missing_ok=True)
+            new_names = set()
+            for png_file in sorted(staging.glob("slide_*.png")):
+                os.replace(png_file, cache_path / png_file.name)
+                new_names.add(png_file.name)
+            for stale in cache_path.glob("slide_*.png"):
+                if stale.name not in new_names:
+                    stale.unlink(missing_ok=True)
+            self._write_stamp(presentation_file, cache_path)
+        finally:
+            marker.unlink(missing_ok=True)
+        return sorted(cache_path.glob("slide_*.png"))
 
     def convert_pptx_to_pdf(self, pptx_file: Path, output_dir: Path) -> Path:
         logger.info("  Converting PPTX to PDF...")
+        generated_pdf = output_dir / f"{pptx_file.stem}.pdf"
+        if ensure_office_listener():
+            # unoconv retries the connection while a freshly started listener boots
+            cmd = ["unoconv", "--pipe", OFFICE_PIPE_NAME, "-f", "pdf", "-o", str(generated_pdf), str(pptx_file)]
+            try:
+                subprocess.run(cmd, check=True, timeout=180)
+                if generated_pdf.exists():
+                    return generated_pdf
+                logger.warning(f"  unoconv produced no PDF for {pptx_file.name}, using one-shot LibreOffice")
+            except (subprocess.SubprocessError, OSError) as e:
+                logger.warning(f"  unoconv failed for {pptx_file.name}, using one-shot LibreOffice: {e}")
         cmd = ["libreoffice", "--headless", "--convert-to", "pdf", "--outdir", str(output_dir), str(pptx_file)]
         subprocess.run(cmd, check=True, timeout=180)
-        generated_pdf = output_dir / f"{pptx_file.stem}.pdf"
         if not generated_pdf.exists():
             raise FileNotFoundError(f"PDF not generated for {pptx_file.name}")
         return generated_pdf
 
+    def _rasterize_with_fitz(self, pdf_file: Path, output_dir: Path):
+        with get_fitz().open(str(pdf_file)) as doc:
+            page_count = doc.page_count
+        workers = min(os.cpu_count() or 1, page_count)
+        if workers < 2:
+            _render_page_range(str(pdf_file), 0, page_count, str(output_dir), self.display_size)
+            return
+        # Split pages into one contiguous shard per core
+        step = -(-page_count // workers)
+        # Never fork: this runs on the converter thread of a multi-threaded gunicorn
+        # worker, and a forked child could inherit a lock held by another thread
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("forkserver")) as pool:
+            futures = [
+                pool.submit(_render_page_range, str(pdf_file), start, min(start + step, page_count), str(output_dir), self.display_size)
+                for start in range(0, page_count, step)
+            ]
+            for future in as_completed(futures):
+                future.result()
+
+    def _rasterize_with_pdftoppm(self, pdf_file: Path, output_dir: Path):
+        prefix = output_dir / "pdftoppm"
+        width, _ = self.display_size
+        cmd = ["pdftoppm", "-png", "-scale-to-x", str(width), "-scale-to-y", "-1", str(pdf_file), str(prefix)]
+        subprocess.run(cmd, check=True, timeout=300)
+        # pdftoppm names pages <prefix>-1.png or <prefix>-01.png depending on page count
+        for page_png in output_dir.glob("pdftoppm-*.png"):
+            page_no = int(page_png.stem.rsplit('-', 1)[1])
+            page_png.replace(output_dir / f"slide_{page_no:03d}.png")
+
+    def _rasterize_pdf(self, pdf_file: Path, output_dir: Path):
+        """Render every page to slide_NNN.png: PyMuPDF in-process if installed,
+        then poppler's pdftoppm, then ImageMagick convert as the last resort.
+        """
+        if get_fitz() is not None:
+            try:
+                self._rasterize_with_fitz(pdf_file, output_dir)
+                return
+            except Exception as e:
+                logger.warning(f"  PyMuPDF failed for {pdf_file.name}: {e}")
+        if shutil.which("pdftoppm"):
+            try:
+                self._rasterize_with_pdftoppm(pdf_file, output_dir)
+                return
+            except (subprocess.SubprocessError, OSError) as e:
+                logger.warning(f"  pdftoppm failed for {pdf_file.name}: {e}")
+        width, height = self.display_size
+        cmd = ["convert", "-density", str(SLIDE_DPI), str(pdf_file), "-resize", f"{width}x{height}", "-quality", "90", str(output_dir / "slide_%03d.png")]
+        subprocess.run(cmd, check=True, timeout=300)
+
     def convert_pdf_to_png(self, pdf_file: Path, output_dir: Path):
         logger.info("  Converting PDF pages to PNG...")
-        cmd = ["convert", "-density", "150", "-quality", "90", str(pdf_file), str(output_dir / "slide_%03d.png")]
-        subprocess.run(cmd, check=True, timeout=300)
+        self._rasterize_pdf(pdf_file, output_dir)
         png_files = sorted(output_dir.glob("slide_*.png"))
         if not png_files:
             raise FileNotFoundError(f"No PNG files generated from {pdf_file.name}")
+        if get_pil_image() is not None:
+            for png_file in png_files:
+                try:
+                    quantize_slide(png_file)
+                except Exception as e:
+                    logger.warning(f"  Could not quantize {png_file.name}: {e}")
         return png_files
 
-    def convert_pptx(self, pptx_file: Path):
-        cache_path = self.get_cache_path(pptx_file)
-        cache_path.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Converting PPTX: {pptx_file.name}")
-        try:
-            pdf_file = self.convert_pptx_to_pdf(pptx_file, cache_path)
-            png_files = self.convert_pdf_to_png(pdf_file, cache_path)
+    def convert_pptx_batch(self, pptx_files, output_dir: Path) -> dict:
+        """Convert several PPTX files with a single LibreOffice run.
+        Returns {pptx_file: pdf_path} for the PDFs that were produced.
+        """
+        logger.info(f"  Converting {len(pptx_files)} PPTX files to PDF in one LibreOffice run...")
+        cmd = ["libreoffice", "--headless", "--convert-to", "pdf", "--outdir", str(output_dir)]
+        cmd.extend(str(f) for f in pptx_files)
+        subprocess.run(cmd, check=True, timeout=180 * len(pptx_files))
+        pdfs = {}
+        for pptx_file in pptx_files:
+            pdf_file = output_dir / f"{pptx_file.stem}.pdf"
+            if pdf_file.exists():
+                pdfs[pptx_file] = pdf_file
+        return pdfs
+
+    @contextmanager
+    def _exclusive(self):
+        """Serialize conversion runs across processes (e.g. gunicorn workers), so two
+        one-shot LibreOffice runs never share the default profile at the same time."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with open(self.cache_dir / self.CONVERTER_LOCK_NAME, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def warm_cache(self, presentation_files):
+        """Convert every presentation that is not cached yet; returns {file: png_files}.
+        Without a persistent listener, uncached PPTX files share one LibreOffice startup.
+        Runs under a cross-process lock; files another process converted meanwhile are
+        skipped.
+        """
+        with self._exclusive():
+            return self._warm_cache(presentation_files)
+
+    def _warm_cache(self, presentation_files):
+        pending = [f for f in presentation_files if not self.is_cached(f)]
+        pptx_files = [f for f in pending if f.suffix.lower() in ('.pptx', '.ppt')]
+        # LibreOffice names its output <stem>.pdf, so stems must be unique within a batch
+        stems = [f.stem for f in pptx_files]
+        batch = [f for f in pptx_files if stems.count(f.stem) == 1]
+        results = {}
+        with tempfile.TemporaryDirectory(dir=self.cache_dir.parent, prefix=".lo-batch-") as tmp_dir:
+            pdfs = {}
+            if len(batch) > 1 and not ensure_office_listener():
+                try:
+                    pdfs = self.convert_pptx_batch(batch, Path(tmp_dir))
+                except (subprocess.SubprocessError, OSError) as e:
+                    logger.warning(f"Batch PPTX conversion failed, converting one by one: {e}")
+            for presentation_file in presentation_files:
+                if presentation_file in pdfs:
+                    results[presentation_file] = self.convert_pptx(presentation_file, pdfs[presentation_file])
+                else:
+                    results[presentation_file] = self.convert_presentation(presentation_file)
+        return results
+
+    def convert_pptx(self, pptx_file: Path, pdf_file: Path = None):
+        """Convert a PPTX to slides; pdf_file may be a PDF already produced by a batch run."""
+        with self._converting(pptx_file) as (cache_path, staging):
+            if self.is_cached(pptx_file):
+                # Another worker finished it while we waited for the lock
+                return sorted(cache_path.glob("slide_*.png"))
+            logger.info(f"Converting PPTX: {pptx_file.name}")
             try:
-                pdf_file.unlink()
-            except Exception:
-                pass
-            logger.info(f"✓ Converted {pptx_file.name}: {len(png_files)} slides")
-            return png_files
-        except Exception as e:
-            logger.error(f"Failed to convert {pptx_file.name}: {e}")
-            return []
+                if pdf_file is None:
+                    pdf_file = self.convert_pptx_to_pdf(pptx_file, staging)
+                self.convert_pdf_to_png(pdf_file, staging)
+                try:
+                    pdf_file.unlink()
+                except Exception:
+                    pass
+                png_files = self._publish_slides(pptx_file, staging, cache_path)
+                logger.info(f"✓ Converted {pptx_file.name}: {len(png_files)} slides")
+                return png_files
+            except Exception as e:
+                logger.error(f"Failed to convert {pptx_file.name}: {e}")
+                return []
 
     def convert_pdf(self, pdf_file: Path):
-        cache_path = self.get_cache_path(pdf_file)
-        cache_path.mkdir(parents=True, exist_ok=True)
-        logger.info(f"Converting PDF: {pdf_file.name}")
-        try:
-            png_files = self.convert_pdf_to_png(pdf_file, cache_path)
-            logger.info(f"✓ Converted {pdf_file.name}: {len(png_files)} slides")
-            return png_files
-        except Exception as e:
-            logger.error(f"Failed to convert {pdf_file.name}: {e}")
-            return []
+        with self._converting(pdf_file) as (cache_path, staging):
+            if self.is_cached(pdf_file):
+                return sorted(cache_path.glob("slide_*.png"))
+            logger.info(f"Converting PDF: {pdf_file.name}")
+            try:
+                self.convert_pdf_to_png(pdf_file, staging)
+                png_files = self._publish_slides(pdf_file, staging, cache_path)
+                logger.info(f"✓ Converted {pdf_file.name}: {len(png_files)} slides")
+                return png_files
+            except Exception as e:
+                logger.error(f"Failed to convert {pdf_file.name}: {e}")
+                return []
 
     def convert_presentation(self, presentation_file: Path):
+        if self.is_cached(presentation_file):
+            logger.info(f"Slides up to date for {presentation_file.name}, skipping conversion")
+            return sorted(self.get_cache_path(presentation_file).glob("slide_*.png"))
         ext = presentation_file.suffix.lower()
         if ext in ('.pptx', '.ppt'):
             return self.convert_pptx(presentation_file)
@@ -94,6 +94,7 @@ apt-get install -y \
     python3-venv \
     python3-dev \
     ffmpeg \
+    poppler-utils \
     vsftpd \
     git \
     curl \
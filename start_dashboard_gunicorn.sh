@@ -9,7 +9,7 @@ echo "=========================================="
 
 # Configuration
 WORKERS=2              # Dashboard is light; threads handle concurrency
-THREADS=4              # Threads per worker
+THREADS=8              # Threads per worker; long uploads each hold one
 BIND="0.0.0.0:5000"
 TIMEOUT=300            # 5 minutes for large uploads
 LOG_LEVEL="info"
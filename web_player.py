@@ -6,63 +6,221 @@ Digital Signage Web Player
 - Auto-refresh when content changes
 """
 
-from flask import Flask, render_template, send_from_directory, jsonify, make_response, request
+from flask import Flask, render_template, send_from_directory, jsonify, request, g
 from pathlib import Path
 import logging
 import json
 import hashlib
 import time
 import os
+import shutil
+import stat
+import sys
+from bisect import bisect_right
+from collections import OrderedDict
 from functools import lru_cache
-from threading import Lock
+from itertools import accumulate
+from threading import Lock, Thread
 
 try:
     import psutil
     HAS_PSUTIL = True
+    # Seed the CPU counters so get_system_stats can use the non-blocking interval=None form
+    psutil.cpu_percent(interval=None)
 except ImportError:
     HAS_PSUTIL = False
     psutil = None
 
+# Optional: orjson for faster playlist/command (de)serialization (falls back to stdlib json).
+# Response bodies are compact with sorted keys either way.
+try:
+    import orjson
+    def json_dumps(obj):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    def json_dumps(obj):
+        return json.dumps(obj, sort_keys=True, separators=(',', ':')).encode()
+    json_loads = json.loads
+
+# Optional: xxhash for the playlist change token (falls back to hashlib.blake2b)
+try:
+    import xxhash
+    HAS_XXHASH = True
+except ImportError:
+    HAS_XXHASH = False
+    xxhash = None
+
+# Optional: inotify_simple lets /api/command serve the pending command from memory
+# instead of re-reading the command file on every client poll (Linux only)
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+    HAS_INOTIFY = True
+except (ImportError, OSError):
+    HAS_INOTIFY = False
+    INotify = None
+    inotify_flags = None
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-# Performance: Playlist cache with TTL
-_playlist_cache = {'data': None, 'hash': None, 'timestamp': 0, 'playlist_mtime': 0.0}
+# Performance: Playlist cache keyed on the sources fingerprint (see get_sources_fingerprint).
+# 'body' is the serialized /api/playlist response, encoded once per rebuild.
+_playlist_cache = {'data': None, 'hash': None, 'body': None, 'sources': None}
 _playlist_cache_lock = Lock()
-PLAYLIST_CACHE_TTL = 5  # seconds
+SOURCES_CHECK_INTERVAL = 0.5  # seconds; content dirs are rescanned at most this often per worker
+_sources_fingerprint = (0.0, None)  # (time.monotonic() of the scan, fingerprint)
 
-# Client tracking (active within the last TTL seconds)
+# Client tracking (active within the last TTL seconds).
+# Kept in last-seen order, so stale clients are always at the front.
 CLIENT_TTL_SECONDS = 60
-_client_last_seen = {}
+CLIENT_TOUCH_INTERVAL = 1  # seconds; last-seen resolution
+_client_last_seen = OrderedDict()
 _client_lock = Lock()
 
 CONFIG_FILE = Path.home() / 'signage' / 'config.json'
+COMMAND_FILE = CONFIG_FILE.parent / 'commands' / 'web.json'
+
+# Pending web command as last seen by the inotify watcher (see start_command_watcher)
+_command_state = {'started': False, 'active': False, 'command': None}
+_command_lock = Lock()
+
+# Without the watcher: last parsed command keyed by the file's stat, and the encoded
+# /api/command body for the last command object served
+_command_file_cache = {'stat': None, 'command': None}
+_command_response_cache = {'command': None, 'body': None}
 
 PLAYLIST_JSON = Path.home() / 'signage' / 'playlist.json'
 
 VIDEOS_DIR = Path.home() / 'signage' / 'content' / 'videos'
 PRESENTATIONS_DIR = Path.home() / 'signage' / 'content' / 'presentations'
 SLIDES_CACHE_DIR = Path.home() / 'signage' / 'cache' / 'slides'
-VIDEO_FORMATS = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
+# str forms for the hot paths, which use os.* directly instead of building Path objects
+VIDEOS_DIR_STR = str(VIDEOS_DIR)
+SLIDES_CACHE_DIR_STR = str(SLIDES_CACHE_DIR)
+VIDEO_FORMATS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')  # lowercase; matched with str.endswith
 SLIDE_DURATION = 10
 
+# Directory listings reused until the directory's mtime changes (an entry was added,
+# removed or renamed). Cached lists are shared between callers; treat them as read-only.
+_video_files_cache = {'mtime': None, 'files': []}
+_slide_dirs_cache = {'mtime': None, 'names': []}
+_listing_cache_lock = Lock()
+
 def get_video_files():
-    files = []
-    if VIDEOS_DIR.exists():
-        for ext in VIDEO_FORMATS:
-            files.extend(VIDEOS_DIR.glob(f"*{ext}"))
-            files.extend(VIDEOS_DIR.glob(f"*{ext.upper()}"))
-    return sorted(files)
-
-def get_slide_files():
-    slides = []
-    if SLIDES_CACHE_DIR.exists():
-        for presentation_dir in sorted(SLIDES_CACHE_DIR.iterdir()):
-            if presentation_dir.is_dir():
-                slides.extend(sorted(presentation_dir.glob("slide_*.png")))
-    return slides
+    """Sorted video file names from a single os.scandir() pass instead of one glob per
+    extension, rescanning only when VIDEOS_DIR's mtime changed.
+    """
+    try:
+        mtime_ns = os.stat(VIDEOS_DIR_STR).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _listing_cache_lock:
+        if _video_files_cache['mtime'] == mtime_ns:
+            return _video_files_cache['files']
+    try:
+        with os.scandir(VIDEOS_DIR_STR) as it:
+            files = sorted(entry.name for entry in it if entry.name.lower().endswith(VIDEO_FORMATS) and entry.is_file())
+    except FileNotFoundError:
+        return []
+    with _listing_cache_lock:
+        _video_files_cache['mtime'] = mtime_ns
+        _video_files_cache['files'] = files
+    return files
+
+def get_presentation_dirs():
+    """Sorted names of the per-presentation folders in SLIDES_CACHE_DIR, cached by its mtime."""
+    try:
+        mtime_ns = os.stat(SLIDES_CACHE_DIR_STR).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    with _listing_cache_lock:
+        if _slide_dirs_cache['mtime'] == mtime_ns:
+            return _slide_dirs_cache['names']
+    try:
+        with os.scandir(SLIDES_CACHE_DIR_STR) as it:
+            names = sorted(entry.name for entry in it if entry.is_dir())
+    except FileNotFoundError:
+        return []
+    with _listing_cache_lock:
+        _slide_dirs_cache['mtime'] = mtime_ns
+        _slide_dirs_cache['names'] = names
+    return names
+
+# Per-presentation slide lists keyed by the slide folder's mtime and slides digest:
+# {stem: ((mtime_ns, digest), [name, ...], [item, ...])}
+_slide_manifest = {}
+_slide_manifest_lock = Lock()
+
+SLIDES_CONVERTING_NAME = '.converting'  # PresentationConverter marker while new slides are swapped in
+SLIDES_DIGEST_NAME = '.slides_digest'  # written by PresentationConverter after each conversion
+
+def _slides_digest(pres_dir):
+    try:
+        with open(os.path.join(pres_dir, SLIDES_DIGEST_NAME)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _load_presentation(stem):
+    """Manifest entry ((mtime_ns, digest), slide names, slide items) for one presentation,
+    rescanned only when its cache folder or slides digest changed, or None if it has no
+    folder. The digest is part of the key because a whole publish can land within one
+    mtime tick; a scan that sees the converting marker is returned but never cached.
+    """
+    pres_dir = os.path.join(SLIDES_CACHE_DIR_STR, stem)
+    try:
+        st = os.stat(pres_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat.S_ISDIR(st.st_mode):
+        return None
+    key = (st.st_mtime_ns, _slides_digest(pres_dir))
+    with _slide_manifest_lock:
+        hit = _slide_manifest.get(stem)
+    if hit and hit[0] == key:
+        return hit
+    try:
+        with os.scandir(pres_dir) as it:
+            names = [entry.name for entry in it]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    converting = SLIDES_CONVERTING_NAME in names
+    if converting:
+        slides = []
+    else:
+        slides = sorted(name for name in names if name.startswith('slide_') and name.endswith('.png'))
+    # Playlist items are built here, once per folder version, and shared by every
+    # playlist build (both /api/playlist and /api/playlist-sync); treat them as read-only
+    url_prefix = f'/content/slides/{stem}/'
+    items = [{
+        'type': 'image',
+        'url': url_prefix + name,
+        'name': name,
+        'duration': SLIDE_DURATION
+    } for name in slides]
+    entry = (key, slides, items)
+    if not converting:
+        with _slide_manifest_lock:
+            _slide_manifest[stem] = entry
+    return entry
+
+def get_presentation_slides(stem):
+    """Sorted slide_*.png file names for one presentation. Returns None if the
+    presentation has no cache folder and an empty list while the deck is still
+    being converted.
+    """
+    entry = _load_presentation(stem)
+    return None if entry is None else entry[1]
+
+def get_presentation_slide_items(stem):
+    """Playlist items for one presentation's slides (same None/[] rules as
+    get_presentation_slides)."""
+    entry = _load_presentation(stem)
+    return None if entry is None else entry[2]
 
 def get_playlist_uncached():
     """Internal function that builds playlist from scratch."""
@@ -76,7 +234,7 @@ def get_playlist_uncached():
     selected = []
     try:
         if PLAYLIST_JSON.exists():
-            data = json.loads(PLAYLIST_JSON.read_text())
+            data = json_loads(PLAYLIST_JSON.read_bytes())
             if isinstance(data, list):
                 # normalize to list of objects with repeats
                 for entry in data:
@@ -94,10 +252,13 @@ def get_playlist_uncached():
         logger.exception('Failed to read playlist.json')
 
     # Build maps
-    video_files = {v.name: v for v in get_video_files()}
+    video_files = set(get_video_files())
     # slides are stored under SLIDES_CACHE_DIR/<presentation_stem>/slide_*.png
     if selected:
         logger.info(f"Using JSON playlist with {len(selected)} entries (web player)")
+        # Item lists are built once per file and repeated with list multiplication
+        # (shared, read-only dicts) instead of re-creating them for every repeat
+        slide_templates = {}
         for entry in selected:
             name = entry.get('name')
             repeats = entry.get('repeats', 1)
@@ -105,26 +266,19 @@ def get_playlist_uncached():
                 continue
             # Check if item still exists (file not deleted)
             if name in video_files and mode in ('both', 'video'):
-                for _ in range(repeats):
-                    playlist.append({
-                        'type': 'video',
-                        'url': f'/content/videos/{video_files[name].name}',
-                        'name': video_files[name].name
-                    })
+                playlist.extend([{
+                    'type': 'video',
+                    'url': f'/content/videos/{name}',
+                    'name': name
+                }] * repeats)
             else:
                 # treat as presentation filename; expand to slides by stem
                 stem = Path(name).stem
-                pres_dir = SLIDES_CACHE_DIR / stem
-                if pres_dir.exists() and pres_dir.is_dir() and mode in ('both', 'presentation'):
-                    for _ in range(repeats):
-                        for slide in sorted(pres_dir.glob('slide_*.png')):
-                            rel = slide.relative_to(SLIDES_CACHE_DIR)
-                            playlist.append({
-                                'type': 'image',
-                                'url': f'/content/slides/{rel.as_posix()}',
-                                'name': slide.name,
-                                'duration': SLIDE_DURATION
-                            })
+                if stem not in slide_templates:
+                    slide_templates[stem] = get_presentation_slide_items(stem)
+                template = slide_templates[stem]
+                if template is not None and mode in ('both', 'presentation'):
+                    playlist.extend(template * repeats)
                 else:
                     # File doesn't exist - skip it
                     logger.warning(f"Skipping orphaned playlist item: {name} (file not found)")
@@ -133,46 +287,87 @@ def get_playlist_uncached():
             if mode in ('both', 'video'):
                 playlist.append({
                 'type': 'video',
-                'url': f'/content/videos/{video.name}',
-                'name': video.name
+                'url': f'/content/videos/{video}',
+                'name': video
                 })
         
-        for slide in get_slide_files():
-            if mode in ('both', 'presentation'):
-                relative_path = slide.relative_to(SLIDES_CACHE_DIR)
-                playlist.append({
-                'type': 'image',
-                'url': f'/content/slides/{relative_path.as_posix()}',
-                'name': slide.name,
-                'duration': SLIDE_DURATION
-                })
+        if mode in ('both', 'presentation'):
+            for stem in get_presentation_dirs():
+                playlist.extend(get_presentation_slide_items(stem) or ())
     
     return playlist
 
-def get_playlist():
-    """Get playlist with caching for performance.
-    Cache invalidates on TTL or when playlist.json mtime changes.
+def get_content_signature():
+    """Cheap fingerprint of the content directories: the mtimes of the videos dir,
+    the slides cache dir and each presentation's slide folder (plus its slides digest,
+    which changes even when a publish lands within one mtime tick). A directory's mtime
+    changes whenever an entry is added, removed or renamed in it.
     """
-    now = time.time()
+    sig = []
+    for directory in (VIDEOS_DIR_STR, SLIDES_CACHE_DIR_STR):
+        try:
+            sig.append(os.stat(directory).st_mtime_ns)
+        except FileNotFoundError:
+            sig.append(0)
     try:
-        pl_mtime = PLAYLIST_JSON.stat().st_mtime if PLAYLIST_JSON.exists() else 0.0
-    except Exception:
-        pl_mtime = 0.0
+        with os.scandir(SLIDES_CACHE_DIR_STR) as it:
+            sig.extend((entry.name, entry.stat().st_mtime_ns, _slides_digest(entry.path))
+                       for entry in it if entry.is_dir())
+    except FileNotFoundError:
+        pass
+    return tuple(sig)
+
+def get_sources_fingerprint():
+    """playlist.json's mtime plus the content signature. Every worker computes the
+    same value from disk, so they all switch to a new playlist within one
+    SOURCES_CHECK_INTERVAL. The scan runs outside any lock and at most once per
+    interval per worker; concurrent pollers in between reuse the last value.
+    """
+    global _sources_fingerprint
+    now = time.monotonic()
+    checked_at, fingerprint = _sources_fingerprint
+    if fingerprint is not None and now - checked_at < SOURCES_CHECK_INTERVAL:
+        return fingerprint
+    try:
+        pl_mtime = PLAYLIST_JSON.stat().st_mtime_ns
+    except OSError:
+        pl_mtime = 0
+    fingerprint = (pl_mtime,) + get_content_signature()
+    _sources_fingerprint = (now, fingerprint)  # one tuple, swapped atomically
+    return fingerprint
 
+def get_playlist():
+    """Get playlist with caching for performance.
+    The cached playlist is reused until the sources fingerprint changes; there is
+    no wall-clock refresh.
+    """
+    playlist, playlist_hash, _ = get_playlist_with_body()
+    return playlist, playlist_hash
+
+def get_playlist_with_body():
+    """Return (playlist, hash, /api/playlist body bytes), rebuilding all three
+    together when the sources fingerprint changed."""
+    # The fingerprint is taken before scanning so a change during the scan
+    # triggers another rebuild on a later request. Neither it nor the rebuild
+    # holds the lock; the lock only guards the compare and the swap.
+    sources = get_sources_fingerprint()
+    with _playlist_cache_lock:
+        if _playlist_cache['data'] is not None and sources == _playlist_cache['sources']:
+            return _playlist_cache['data'], _playlist_cache['hash'], _playlist_cache['body']
+        previous_hash, previous_body = _playlist_cache['hash'], _playlist_cache['body']
+    playlist = get_playlist_uncached()
+    playlist_hash = get_playlist_hash_from(playlist)
+    if playlist_hash != previous_hash:
+        body = json_dumps({'playlist': playlist, 'hash': playlist_hash})
+    else:
+        body = previous_body
     with _playlist_cache_lock:
-        expired = (_playlist_cache['data'] is None) or ((now - _playlist_cache['timestamp']) > PLAYLIST_CACHE_TTL)
-        changed = (pl_mtime != _playlist_cache.get('playlist_mtime', 0.0))
-        if expired or changed:
-            # Cache expired or source changed - rebuild
-            playlist = get_playlist_uncached()
-            playlist_str = json.dumps(playlist, sort_keys=True)
-            playlist_hash = hashlib.md5(playlist_str.encode()).hexdigest()
-            _playlist_cache['data'] = playlist
-            _playlist_cache['hash'] = playlist_hash
-            _playlist_cache['timestamp'] = now
-            _playlist_cache['playlist_mtime'] = pl_mtime
-            logger.debug(f"Playlist cache refreshed (hash: {playlist_hash[:8]}...)")
-        return _playlist_cache['data'], _playlist_cache['hash']
+        _playlist_cache['data'] = playlist
+        _playlist_cache['hash'] = playlist_hash
+        _playlist_cache['body'] = body
+        _playlist_cache['sources'] = sources
+    logger.debug(f"Playlist cache refreshed (hash: {playlist_hash[:8]}...)")
+    return playlist, playlist_hash, body
 
 def get_playlist_hash():
     _, playlist_hash = get_playlist()
@@ -186,13 +381,30 @@ def get_playlist_hash():
 _sync_playlist_cache = None
 _sync_playlist_hash_cache = None
 _sync_playlist_start_time = None
+_sync_playlist_content_sig = None
+_sync_playlist_cumulative = []  # end offset of each item, see get_cumulative_durations
+_sync_playlist_lock = Lock()
+
+DEFAULT_VIDEO_DURATION = 30  # seconds
+
+@lru_cache(maxsize=512)
+def _duration_for(path_str, mtime_ns, size):
+    """Probe a video's duration in seconds (placeholder).
+    For a production system integrate ffprobe or mediainfo here; results are
+    memoized per (path, mtime, size) so each file is probed once per version.
+    """
+    return DEFAULT_VIDEO_DURATION
 
 def get_video_duration(video_path):
-    """Get video duration in seconds (placeholder).
-    For a production system integrate ffprobe or mediainfo. Using
-    a sensible default prevents the sync endpoint from breaking.
+    """Get video duration in seconds for a path (str or Path).
+    Using a sensible default when the file can't be read prevents the
+    sync endpoint from breaking.
     """
-    return 30  # default estimate in seconds
+    try:
+        st = os.stat(video_path)
+    except OSError:
+        return DEFAULT_VIDEO_DURATION
+    return _duration_for(os.fspath(video_path), st.st_mtime_ns, st.st_size)
 
 def build_playlist_with_durations():
     """Build playlist including per-item durations for sync playback."""
@@ -203,51 +415,123 @@ def build_playlist_with_durations():
 
     for video in get_video_files():
         if mode in ('both', 'video'):
-            duration = get_video_duration(video)
+            duration = get_video_duration(os.path.join(VIDEOS_DIR_STR, video))
             playlist.append({
                 'type': 'video',
-                'url': f'/content/videos/{video.name}',
-                'name': video.name,
+                'url': f'/content/videos/{video}',
+                'name': video,
                 'duration': duration
             })
 
-    for slide in get_slide_files():
-        if mode in ('both', 'presentation'):
-            relative_path = slide.relative_to(SLIDES_CACHE_DIR)
-            playlist.append({
-                'type': 'image',
-                'url': f'/content/slides/{relative_path.as_posix()}',
-                'name': slide.name,
-                'duration': SLIDE_DURATION
-            })
+    if mode in ('both', 'presentation'):
+        for stem in get_presentation_dirs():
+            playlist.extend(get_presentation_slide_items(stem) or ())
 
     return playlist
 
-def get_playlist_hash_from(playlist):
-    playlist_str = json.dumps(playlist, sort_keys=True)
-    return hashlib.md5(playlist_str.encode()).hexdigest()
-
-def calculate_total_duration(playlist):
-    return sum(item.get('duration', 0) for item in playlist)
+def get_sync_playlist():
+    """Return (playlist, hash, start_time, cumulative durations) for the sync endpoint.
+    Cached like get_playlist(): rebuilt only when the content signature (the content
+    part of the sources fingerprint) changes.
+    The start time is reset whenever the playlist hash changes.
+    """
+    global _sync_playlist_cache, _sync_playlist_hash_cache, _sync_playlist_start_time
+    global _sync_playlist_content_sig, _sync_playlist_cumulative
+
+    content_sig = get_sources_fingerprint()[1:]  # rate-limited scan, taken outside the lock
+    with _sync_playlist_lock:
+        if _sync_playlist_cache is None or content_sig != _sync_playlist_content_sig:
+            playlist = build_playlist_with_durations()
+            playlist_hash = get_playlist_hash_from(playlist)
+            if playlist_hash != _sync_playlist_hash_cache:
+                _sync_playlist_hash_cache = playlist_hash
+                _sync_playlist_start_time = time.time()
+                logger.info(f"Playlist updated (sync): {len(playlist)} items")
+            _sync_playlist_cache = playlist
+            _sync_playlist_cumulative = get_cumulative_durations(playlist)
+            _sync_playlist_content_sig = content_sig
+        return _sync_playlist_cache, _sync_playlist_hash_cache, _sync_playlist_start_time, _sync_playlist_cumulative
+
+def _content_path_for_url(url):
+    for prefix, base in (('/content/videos/', VIDEOS_DIR_STR), ('/content/slides/', SLIDES_CACHE_DIR_STR)):
+        if url.startswith(prefix):
+            return os.path.join(base, url[len(prefix):])
+    return None
 
-def get_current_item_index(playlist, elapsed_time):
-    total_duration = calculate_total_duration(playlist)
-    if total_duration == 0:
+def get_playlist_hash_from(playlist):
+    """Hash the playlist plus (mtime_ns, size) of every referenced file, so replacing
+    a video or re-rendering a deck under the same name still changes the hash.
+    Slides from a converted deck contribute the deck's precomputed content digest
+    instead of one stat() per slide.
+    The hash is only a change token, so a fast non-cryptographic hash (xxh3) is used
+    when available. Both it and the blake2b fallback are unsalted, so the token stays
+    stable across restarts and gunicorn workers, unlike Python's hash().
+    """
+    h = xxhash.xxh3_128() if HAS_XXHASH else hashlib.blake2b(digest_size=16)
+    # Fields are fed to the hasher item by item; no JSON or joined copy of the playlist is built
+    for item in playlist:
+        h.update(f"{item.get('type')}\0{item.get('url')}\0{item.get('name')}\0{item.get('duration', '')}\n".encode())
+    seen = set()
+    digested_dirs = {}
+    for item in playlist:
+        url = item.get('url')
+        if not url or url in seen:
+            continue
+        seen.add(url)
+        path = _content_path_for_url(url)
+        if path is not None and item.get('type') == 'image':
+            pres_dir = os.path.dirname(path)
+            if pres_dir not in digested_dirs:
+                digest = _slides_digest(pres_dir)
+                digested_dirs[pres_dir] = digest
+                if digest:
+                    h.update(f"{os.path.basename(pres_dir)}\0{digest}\n".encode())
+            if digested_dirs[pres_dir]:
+                continue
+        if path is None:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        h.update(f"{url}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+    return h.hexdigest()
+
+def get_cumulative_durations(playlist):
+    """End offset of each item within one loop; the last value is the total duration."""
+    return list(accumulate(item.get('duration', 0) for item in playlist))
+
+def get_current_item_index(playlist, elapsed_time, cumulative=None):
+    """Return (index, seconds into that item) for elapsed_time since the loop started.
+    Pass the playlist's precomputed cumulative durations to skip the O(N) pass;
+    the lookup itself is a binary search.
+    """
+    if cumulative is None:
+        cumulative = get_cumulative_durations(playlist)
+    if not cumulative or cumulative[-1] <= 0:
         return 0, 0
 
-    position_in_loop = elapsed_time % total_duration
-    cumulative = 0
-    for idx, item in enumerate(playlist):
-        if cumulative + item.get('duration', 0) > position_in_loop:
-            item_elapsed = position_in_loop - cumulative
-            return idx, item_elapsed
-        cumulative += item.get('duration', 0)
-
-    return 0, 0
+    position_in_loop = elapsed_time % cumulative[-1]
+    # First item whose end offset lies beyond the position (zero-length items are skipped)
+    idx = bisect_right(cumulative, position_in_loop)
+    if idx >= len(cumulative):
+        return 0, 0
+    return idx, position_in_loop - (cumulative[idx - 1] if idx else 0)
 
 def get_client_ip():
-    """Get client IP, handling proxy headers."""
-    return (request.headers.get('X-Forwarded-For') or request.remote_addr or '').split(',')[0].strip()
+    """Get client IP, handling proxy headers. Parsed once per request and kept on g."""
+    if 'client_ip' in g:
+        return g.client_ip
+    g.client_ip = (request.headers.get('X-Forwarded-For') or request.remote_addr or '').split(',')[0].strip()
+    return g.client_ip
+
+def _prune_clients(cutoff):
+    """Drop clients last seen before cutoff (caller holds _client_lock)."""
+    while _client_last_seen:
+        ip, ts = next(iter(_client_last_seen.items()))
+        if ts >= cutoff:
+            break
+        del _client_last_seen[ip]
 
 def track_client():
     """Track active client by IP with last-seen timestamp."""
@@ -255,35 +539,44 @@ def track_client():
     if not client_ip:
         return
     now = time.time()
-    ttl = CLIENT_TTL_SECONDS
+    # A TV polls several endpoints each cycle; a lock-free read skips the write
+    # (and the lock) when this client was already recorded within the last second.
+    last_seen = _client_last_seen.get(client_ip)
+    if last_seen is not None and now - last_seen < CLIENT_TOUCH_INTERVAL:
+        return
     with _client_lock:
         _client_last_seen[client_ip] = now
-        # prune stale entries occasionally
-        if len(_client_last_seen) > 200:
-            cutoff = now - ttl
-            for ip, ts in list(_client_last_seen.items()):
-                if ts < cutoff:
-                    _client_last_seen.pop(ip, None)
+        _client_last_seen.move_to_end(client_ip)
+        _prune_clients(now - CLIENT_TTL_SECONDS)
 
 def get_active_clients():
     """Return count of clients seen within TTL window."""
-    now = time.time()
-    cutoff = now - CLIENT_TTL_SECONDS
     with _client_lock:
-        # prune and count
-        stale = [ip for ip, ts in _client_last_seen.items() if ts < cutoff]
-        for ip in stale:
-            _client_last_seen.pop(ip, None)
+        _prune_clients(time.time() - CLIENT_TTL_SECONDS)
         return len(_client_last_seen)
 
 
+SYSTEM_STATS_TTL = 1  # seconds; /health and /api/status share one sample per window
+_system_stats_cache = {'stats': None, 'timestamp': 0.0}
+_system_stats_lock = Lock()
+
 def get_system_stats():
-    """Return lightweight system stats if psutil is available."""
+    """Return lightweight system stats if psutil is available (cached for SYSTEM_STATS_TTL)."""
     if not HAS_PSUTIL:
         return None
+    now = time.monotonic()
+    with _system_stats_lock:
+        if _system_stats_cache['stats'] is None or now - _system_stats_cache['timestamp'] >= SYSTEM_STATS_TTL:
+            _system_stats_cache['stats'] = read_system_stats()
+            _system_stats_cache['timestamp'] = now
+        return _system_stats_cache['stats']
+
+def read_system_stats():
+    """Sample CPU, RAM and temperature via psutil."""
     stats = {}
     try:
-        stats['cpu_percent'] = psutil.cpu_percent(interval=0.1)
+        # CPU usage since the previous sample (non-blocking; seeded at import)
+        stats['cpu_percent'] = psutil.cpu_percent(interval=None)
     except Exception:
         stats['cpu_percent'] = None
     try:
@@ -314,14 +607,13 @@ def player():
 @app.route('/api/playlist')
 def api_playlist():
     track_client()
-    playlist, playlist_hash = get_playlist()
-    response = make_response(jsonify({
-        'playlist': playlist,
-        'hash': playlist_hash
-    }))
-    # Cache for 5 seconds on client side
+    # The body was encoded when the playlist was rebuilt; polls only send the bytes
+    _, playlist_hash, body = get_playlist_with_body()
+    response = app.response_class(body, mimetype='application/json')
+    # Cache for 5 seconds on client side, then revalidate with If-None-Match (304, no body)
     response.headers['Cache-Control'] = 'public, max-age=5'
-    return response
+    response.set_etag(playlist_hash)
+    return response.make_conditional(request)
 
 @app.route('/api/status')
 def api_status():
@@ -341,23 +633,38 @@ def api_status():
         return jsonify({'ok': False, 'error': 'server error'}), 500
 
 
-@app.route('/health')
-def health():
-    """Lightweight health/status page (JSON or HTML)."""
+HEALTH_CACHE_TTL = 1  # seconds; bursts of /health polls share one rendered page
+_health_cache = {'timestamp': 0.0, 'json': None, 'html': None}
+_health_cache_lock = Lock()
+
+_HEALTH_HTML = """
+        <html><body style='font-family: monospace; padding: 12px;'>
+        <h3>Signage Health</h3>
+        <div>Active clients: {active_clients}</div>
+        <div>Playlist items: {playlist_items}</div>
+        <div>Playlist hash: {playlist_hash}</div>
+        <div>Playlist mtime: {playlist_mtime}</div>
+        <div>CPU%: {cpu_percent}</div>
+        <div>RAM%: {ram_percent}</div>
+        <div>Temp C: {temp_c}</div>
+        <div>Timestamp: {timestamp}</div>
+        </body></html>
+        """
+
+def build_health_payload():
     try:
         playlist, playlist_hash = get_playlist()
         playlist_items = len(playlist)
     except Exception:
-        playlist = []
         playlist_hash = None
         playlist_items = 0
 
     try:
-        pl_mtime = PLAYLIST_JSON.stat().st_mtime if PLAYLIST_JSON.exists() else None
-    except Exception:
+        pl_mtime = os.stat(PLAYLIST_JSON).st_mtime
+    except OSError:
         pl_mtime = None
 
-    payload = {
+    return {
         'ok': True,
         'active_clients': get_active_clients(),
         'playlist_items': playlist_items,
@@ -367,28 +674,27 @@ def health():
         'system_stats': get_system_stats(),
     }
 
+@app.route('/health')
+def health():
+    """Lightweight health/status page (JSON or HTML), rendered at most once per HEALTH_CACHE_TTL."""
     wants_html = 'text/html' in (request.headers.get('Accept') or '') or request.args.get('html') == '1'
-    if wants_html:
-        # Simple HTML view
-        stats = payload.get('system_stats') or {}
-        html = f"""
-        <html><body style='font-family: monospace; padding: 12px;'>
-        <h3>Signage Health</h3>
-        <div>Active clients: {payload['active_clients']}</div>
-        <div>Playlist items: {payload['playlist_items']}</div>
-        <div>Playlist hash: {payload['playlist_hash']}</div>
-        <div>Playlist mtime: {payload['playlist_mtime']}</div>
-        <div>CPU%: {stats.get('cpu_percent')}</div>
-        <div>RAM%: {stats.get('ram_percent')}</div>
-        <div>Temp C: {stats.get('temp_c')}</div>
-        <div>Timestamp: {payload['timestamp']}</div>
-        </body></html>
-        """
-        response = make_response(html)
-        response.headers['Content-Type'] = 'text/html'
-        return response
+    now = time.monotonic()
+    with _health_cache_lock:
+        if now - _health_cache['timestamp'] >= HEALTH_CACHE_TTL:
+            payload = build_health_payload()
+            stats = payload.get('system_stats') or {}
+            _health_cache['json'] = json_dumps(payload)
+            _health_cache['html'] = _HEALTH_HTML.format(
+                cpu_percent=stats.get('cpu_percent'),
+                ram_percent=stats.get('ram_percent'),
+                temp_c=stats.get('temp_c'),
+                **payload)
+            _health_cache['timestamp'] = now
+        body = _health_cache['html'] if wants_html else _health_cache['json']
 
-    return jsonify(payload)
+    if wants_html:
+        return app.response_class(body, mimetype='text/html')
+    return app.response_class(body, mimetype='application/json')
 
 
 @app.route('/api/playlist-sync')
@@ -397,21 +703,11 @@ def api_playlist_sync():
     Returns playlist with durations and server timing so clients can
     align playback. This does not replace the original `/api/playlist`.
     """
-    global _sync_playlist_cache, _sync_playlist_hash_cache, _sync_playlist_start_time
+    playlist, playlist_hash, start_time, cumulative = get_sync_playlist()
 
-    playlist = build_playlist_with_durations()
-    playlist_hash = get_playlist_hash_from(playlist)
-
-    # If playlist changed, reset start time
-    if playlist_hash != _sync_playlist_hash_cache:
-        _sync_playlist_cache = playlist
-        _sync_playlist_hash_cache = playlist_hash
-        _sync_playlist_start_time = time.time()
-        logger.info(f"Playlist updated (sync): {len(playlist)} items")
-
-    if _sync_playlist_start_time and playlist:
-        elapsed = time.time() - _sync_playlist_start_time
-        current_index, item_elapsed = get_current_item_index(playlist, elapsed)
+    if start_time and playlist:
+        elapsed = time.time() - start_time
+        current_index, item_elapsed = get_current_item_index(playlist, elapsed, cumulative)
     else:
         current_index = 0
         item_elapsed = 0
@@ -420,51 +716,135 @@ def api_playlist_sync():
         'playlist': playlist,
         'hash': playlist_hash,
         'serverTime': time.time(),
-        'playlistStartTime': _sync_playlist_start_time or time.time(),
+        'playlistStartTime': start_time or time.time(),
         'currentIndex': current_index,
         'itemElapsed': item_elapsed
     })
 
 
+def read_command_file():
+    """Return the pending command dict, {} if unreadable, or None if there is none."""
+    try:
+        raw = COMMAND_FILE.read_bytes()
+    except FileNotFoundError:
+        return None
+    try:
+        return json_loads(raw)
+    except Exception:
+        return {}
+
+def read_command_cached():
+    """read_command_file() behind a stat() check: the file is only re-read and
+    re-parsed when its mtime, size or inode changed."""
+    try:
+        st = COMMAND_FILE.stat()
+    except FileNotFoundError:
+        return None
+    key = (st.st_mtime_ns, st.st_size, st.st_ino)
+    with _command_lock:
+        if _command_file_cache['stat'] == key:
+            return _command_file_cache['command']
+    command = read_command_file()
+    with _command_lock:
+        _command_file_cache['stat'] = key
+        _command_file_cache['command'] = command
+    return command
+
+def _command_watch_loop(notifier):
+    lost = inotify_flags.IGNORED | inotify_flags.DELETE_SELF | inotify_flags.MOVE_SELF
+    try:
+        while True:
+            events = notifier.read()
+            if any(event.mask & lost for event in events):
+                logger.warning('Command watch lost, falling back to reading the file')
+                _command_state['active'] = False
+                return
+            # On a queue overflow events were dropped, so re-read regardless
+            if any(event.name == COMMAND_FILE.name or event.mask & inotify_flags.Q_OVERFLOW for event in events):
+                _command_state['command'] = read_command_file()
+    except Exception:
+        logger.exception('Command watcher failed, falling back to reading the file')
+        _command_state['active'] = False
+
+def start_command_watcher():
+    """Watch the commands dir once per process so polls don't touch the disk."""
+    with _command_lock:
+        if _command_state['started']:
+            return
+        _command_state['started'] = True
+    if not HAS_INOTIFY:
+        return
+    try:
+        COMMAND_FILE.parent.mkdir(parents=True, exist_ok=True)
+        notifier = INotify()
+        mask = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.DELETE |
+                inotify_flags.MOVED_FROM | inotify_flags.DELETE_SELF | inotify_flags.MOVE_SELF)
+        notifier.add_watch(str(COMMAND_FILE.parent), mask)
+        # Read after the watch exists so a write in between is not missed
+        _command_state['command'] = read_command_file()
+        Thread(target=_command_watch_loop, args=(notifier,), name='command-watcher', daemon=True).start()
+        _command_state['active'] = True
+    except Exception:
+        logger.exception('Failed to start command watcher')
+
 @app.route('/api/command')
 def api_command():
     """Return any pending command intended for web players and clear it."""
+    # Do NOT delete the command file here — keep it for other connected clients.
+    # Clients will deduplicate using the timestamp (ts) value.
     try:
-        cmdfile = CONFIG_FILE.parent.joinpath('commands', 'web.json')
-        if cmdfile.exists():
-            try:
-                data = json.loads(cmdfile.read_text())
-            except Exception:
-                data = {}
-            # Do NOT delete the command file here — keep it for other connected clients.
-            # Clients will deduplicate using the timestamp (ts) value.
-            return jsonify({'ok': True, 'command': data})
+        start_command_watcher()
+        if _command_state['active']:
+            data = _command_state['command']
+        else:
+            data = read_command_cached()
     except Exception:
         logger.exception('Failed reading command file')
-    return jsonify({'ok': True, 'command': None})
+        data = None
+    # Both sources hand out the same object until the command changes, so the
+    # encoded body is reused for every poll in between
+    with _command_lock:
+        if _command_response_cache['body'] is None or _command_response_cache['command'] is not data:
+            _command_response_cache['body'] = json_dumps({'ok': True, 'command': data})
+            _command_response_cache['command'] = data
+        body = _command_response_cache['body']
+    return app.response_class(body, mimetype='application/json')
 
 @app.route('/content/videos/<path:filename>')
 def serve_video(filename):
-    response = make_response(send_from_directory(VIDEOS_DIR, filename))
-    # Cache videos for 1 hour (they rarely change)
-    response.headers['Cache-Control'] = 'public, max-age=3600'
-    return response
+    # Cache videos for 1 hour (they rarely change). Conditional responses give
+    # 304s on revalidation and 206s for Range requests; the body is streamed via
+    # the server's wsgi.file_wrapper (sendfile(2) under gunicorn).
+    return send_from_directory(VIDEOS_DIR, filename, conditional=True, etag=True, max_age=3600)
 
 @app.route('/content/slides/<path:filename>')
 def serve_slide(filename):
-    response = make_response(send_from_directory(SLIDES_CACHE_DIR, filename))
     # Cache slides for 1 hour
-    response.headers['Cache-Control'] = 'public, max-age=3600'
-    return response
+    return send_from_directory(SLIDES_CACHE_DIR, filename, conditional=True, etag=True, max_age=3600)
 
 if __name__ == '__main__':
     logger.info("=" * 60)
     logger.info("Starting Web Player for Network TVs")
     logger.info("TVs should open: http://<pi-ip>:8080")
     logger.info("=" * 60)
-    logger.info("NOTE: For production use, run with gunicorn:")
-    logger.info("  gunicorn -w 4 -b 0.0.0.0:8080 web_player:app")
-    logger.info("=" * 60)
-    
+
+    # Production path: hand the process over to gunicorn with the same settings as
+    # start_web_player_gunicorn.sh. Pass --dev to use the Flask development server.
+    gunicorn = shutil.which('gunicorn')
+    if gunicorn and '--dev' not in sys.argv[1:]:
+        logger.info("Running under gunicorn (2 workers x 8 threads, gthread)")
+        os.execv(gunicorn, [
+            gunicorn,
+            '--workers', '2',
+            '--threads', '8',
+            '--worker-class', 'gthread',
+            '--bind', '0.0.0.0:8080',
+            '--keep-alive', '75',
+            '--chdir', os.path.dirname(os.path.abspath(__file__)),
+            'web_player:app',
+        ])
+
+    if not gunicorn:
+        logger.warning("gunicorn not found - falling back to the Flask development server")
     # Enable threading for concurrent requests (development mode only)
     app.run(host='0.0.0.0', port=8080, debug=False, threaded=True)